@@ -1,7 +1,8 @@
 import cv2
 import numpy as np
 import random
-from typing import List
+import math
+from typing import List, Tuple
 from mashcima.canvas_items.BeamedNote import BeamedNote
 from mashcima.debug import draw_cross
 
@@ -38,6 +39,8 @@ class Beam:
         self.pivot = (0, 0)
         self.slope = 0
         self._tops = []  # list of points for debug rendering
+        self._lines = []  # beam lines in pixel space (see prepare_render)
+        self._chains = []  # beam lines joined into polylines
 
         # pre-compute some values
         self._compute_sided_beam_counts()
@@ -64,34 +67,38 @@ class Beam:
             elif sign * top[1] < sign * pivot[1]:
                 pivot = top
 
-        # calculate viable slopes from pivot (that don't drop below any tops)
+        # each top bounds the slope of a beam going through the pivot
+        # (from above for tops to the right, from below for tops to the left),
+        # so the slopes that don't drop below any tops form an interval
+        SLACK = 5  # slack for rounding error
+        min_slope = -math.inf
+        max_slope = math.inf
+        for x, y in tops:
+            dx = (x - pivot[0]) * sign
+            if dx == 0:
+                continue
+            bound = (sign * (y - pivot[1]) + SLACK) / dx
+            if dx > 0:
+                max_slope = min(max_slope, bound)
+            else:
+                min_slope = max(min_slope, bound)
+
+        # viable slopes from pivot to the other tops
         slopes = []
-        for i, t in enumerate(tops):
+        for t in tops:
             if t == pivot:
                 continue
-
             s = (pivot[1] - t[1]) / (pivot[0] - t[0])
-
-            too_low = False
-            for tt in tops:
-                SLACK = 5  # slack for rounding error
-                if ((tt[0] - pivot[0]) * s + pivot[1] - SLACK * sign) * sign > tt[1] * sign:
-                    too_low = True
-                    break
-            if too_low:
-                continue
-
-            slopes.append(s)
+            if min_slope <= s <= max_slope:
+                slopes.append(s)
 
         if len(slopes) == 0:
             print("Warning: No slopes found when placing a beam!")
             slopes.append(0)
 
         # pick the slope closest to the fitting line slope
-        line = cv2.fitLine(np.array(tops), cv2.DIST_L2, 0, 0, 0).flatten()
-        fitting_slope = line[1] / line[0]
-
-        self.slope = sorted(slopes, key=lambda x: abs(x - fitting_slope))[0]
+        fitting_slope = _fit_line_slope(tops)
+        self.slope = min(slopes, key=lambda x: abs(x - fitting_slope))
         self.pivot = pivot
 
         # randomize slope if too straight
@@ -143,23 +150,42 @@ class Beam:
             else:
                 item.right_beam_count += remaining
 
-    def render(self, img: np.ndarray):
+    def prepare_render(self):
+        """
+        Called after items have been prepared for rendering, computes the beam
+        lines in canvas pixel space (including the random partial beams)
+        """
+        self._lines = []
         for i in range(len(self.items) - 1):
-            self._render_segment(img, self.items[i], self.items[i + 1])
-
-        if self.DEBUG_RENDER:
-            draw_cross(img, *self.pivot, 5)
-            for t in self._tops:
-                draw_cross(img, *t, 2)
-            cv2.line(
-                img,
-                self._f(self.items[0].sprites.position_x),
-                self._f(self.items[-1].sprites.position_x),
-                thickness=1,
-                color=0.5
-            )
-
-    def _render_segment(self, img: np.ndarray, start: BeamedNote, end: BeamedNote):
+            self._place_segment_lines(self.items[i], self.items[i + 1])
+
+        # join lines that continue one another
+        # (each beam level becomes a single polyline)
+        self._chains = []
+        for a, b in self._lines:
+            for chain in self._chains:
+                if chain[-1] == a:
+                    chain.append(b)
+                    break
+            else:
+                self._chains.append([a, b])
+
+    def add_to_scene(self, scene):
+        scene.add_beam(self._chains)
+
+    def render_debug(self, img: np.ndarray):
+        draw_cross(img, *self.pivot, 5)
+        for t in self._tops:
+            draw_cross(img, *t, 2)
+        cv2.line(
+            img,
+            self._f(self.items[0].sprites.position_x),
+            self._f(self.items[-1].sprites.position_x),
+            thickness=1,
+            color=0.5
+        )
+
+    def _place_segment_lines(self, start: BeamedNote, end: BeamedNote):
         a = start.global_stem_head
         b = end.global_stem_head
 
@@ -171,7 +197,7 @@ class Beam:
         right_beams = end.left_beam_count
 
         while left_beams > 0 and right_beams > 0:
-            cv2.line(img, a, b, thickness=BEAM_THICKNESS, color=1)
+            self._lines.append((a, b))
             a, b = step_down(a, b)
             left_beams -= 1
             right_beams -= 1
@@ -179,13 +205,48 @@ class Beam:
         while left_beams > 0:
             t = random.uniform(0.6, 0.8)
             m = (int(a[0] * t + b[0] * (1 - t)), int(a[1] * t + b[1] * (1 - t)))
-            cv2.line(img, a, m, thickness=BEAM_THICKNESS, color=1)
+            self._lines.append((a, m))
             a, b = step_down(a, b)
             left_beams -= 1
 
         while right_beams > 0:
             t = random.uniform(0.2, 0.4)
             m = (int(a[0] * t + b[0] * (1 - t)), int(a[1] * t + b[1] * (1 - t)))
-            cv2.line(img, m, b, thickness=BEAM_THICKNESS, color=1)
+            self._lines.append((m, b))
             a, b = step_down(a, b)
             right_beams -= 1
+
+
+def _fit_line_slope(points: List[Tuple[int, int]]) -> float:
+    """
+    Slope of the total least squares line fitting the points
+    (the line cv2.fitLine with DIST_L2 finds), in the closed form
+    """
+    mean_x = sum(p[0] for p in points) / len(points)
+    mean_y = sum(p[1] for p in points) / len(points)
+    sxx, syy, sxy = 0.0, 0.0, 0.0
+    for x, y in points:
+        sxx += (x - mean_x) ** 2
+        syy += (y - mean_y) ** 2
+        sxy += (x - mean_x) * (y - mean_y)
+    return math.tan(math.atan2(2 * sxy, sxx - syy) / 2)
+
+
+def get_beam_polygons(
+        chains: List[List[Tuple[int, int]]],
+        offset: Tuple[int, int] = (0, 0)
+) -> List[np.ndarray]:
+    """
+    Returns polygons of a beam, one for each polyline of the beam,
+    by giving the polyline the beam thickness vertically
+    """
+    half = BEAM_THICKNESS // 2
+    ox, oy = offset
+    return [
+        np.array(
+            [(x - ox, y - oy - half) for x, y in chain]
+            + [(x - ox, y - oy + half) for x, y in reversed(chain)],
+            dtype=np.int32
+        )
+        for chain in chains
+    ]
@@ -7,6 +7,7 @@ from mashcima.canvas_items.BeamedNote import BeamedNote
 from mashcima.Slur import Slur
 from mashcima.Beam import Beam
 from mashcima.CanvasOptions import CanvasOptions
+from mashcima.Scene import Scene
 import numpy as np
 import random
 
@@ -27,6 +28,10 @@ class Canvas:
 
         # options that alter how is the staff printed
         self.options = CanvasOptions() if options is None else options
+
+        # composite sprites of all items in a single pass
+        # (set to False to render sprite by sprite, e.g. when debugging)
+        self.use_draw_list = True
         
     def add(self, item: CanvasItem):
         if self._construction_finished:
@@ -139,6 +144,31 @@ class Canvas:
             head_start: int
     ) -> int:
         """More advanced rendering that renders onto a given staff image"""
+        head = self.place(repo, pitch_positions, head_start)
+
+        scene = Scene(img.shape[1], img.shape[0])
+        self.add_to_scene(scene, repo)
+        scene.render_onto(repo, img)
+
+        for item in self.items:
+            if item.DEBUG_RENDER:
+                item.render_debug(img)
+        for b in self.beams:
+            if b.DEBUG_RENDER:
+                b.render_debug(img)
+
+        return head
+
+    def place(
+            self,
+            repo: SymbolRepository,
+            pitch_positions: Dict[int, int],
+            head_start: int
+    ) -> int:
+        """
+        Selects sprites and places everything in the pixel space without
+        drawing anything, returns the head position after the last item
+        """
         if not self._construction_finished:
             self.finish_construction()
 
@@ -153,18 +183,33 @@ class Canvas:
         for b in self.beams:
             b.place()
 
-        # render
+        # decide the remaining random details
+        # (so that rendering itself is deterministic)
         for item in self.items:
-            item.render(img)
+            item.prepare_render()
 
         for b in self.beams:
-            b.render(img)
+            b.prepare_render()
 
         for s in self.slurs:
-            s.render(img)
+            s.place()
 
         return head
 
+    def add_to_scene(self, scene: Scene, repo: SymbolRepository):
+        """Adds everything placed into a scene, without drawing anything"""
+        if not self.use_draw_list:
+            scene.use_draw_list = False
+
+        for item in self.items:
+            item.add_to_scene(scene, repo)
+
+        for b in self.beams:
+            b.add_to_scene(scene)
+
+        for s in self.slurs:
+            s.add_to_scene(scene)
+
     def _place_items(self, pitch_positions, head_start):
         """Move items to proper places in the pixel space"""
         for item in self.items:
@@ -1,12 +1,13 @@
 import os
 import appdirs
 import shutil
-import requests
-import tqdm
-import zipfile
 
 
 def download_file(url, path):
+    # imported only here, since downloading happens just once
+    import requests
+    import tqdm
+
     print("Downloading " + url)
     print("and saving it to " + path)
     
@@ -78,11 +79,19 @@ class Config:
             "data/cropobjects_withstaff"
         )
         self.PRIMUS_PATH = primus_path
-        self.MUSCIMA_PP_DOCUMENTS_CACHE_PATH = os.path.join(
+        self.MUSCIMA_PP_DOCUMENTS_CACHE_DIRECTORY = os.path.join(
+            Config.MASHCIMA_DIR,
+            "muscima-pp-documents-cache"
+        )
+        self.COMPILED_REPOSITORIES_DIRECTORY = os.path.join(
             Config.MASHCIMA_DIR,
-            "muscima-pp-documents-cache.pkl"
+            "compiled-repositories"
         )
 
+        # number of processes parsing MUSCIMA++ XML files when building
+        # the documents cache (None means all cores where possible)
+        self.PARSING_WORKERS = None
+
     def check_mashcima_dir(self):
         """Creates the mashcima dir if not preset"""
         if not os.path.isdir(Config.MASHCIMA_DIR):
@@ -92,6 +101,8 @@ class Config:
         if os.path.isdir(self.MUSCIMA_PP_PATH):
             return # already downloaded
 
+        import zipfile
+
         print("Downloading MUSCIMA++ dataset...")
         downloaded_zip = os.path.join(Config.MASHCIMA_DIR, "MUSCIMA-pp_v1.0.zip")
         self.check_mashcima_dir()
@@ -0,0 +1,59 @@
+import numpy as np
+from typing import List
+from mashcima.utils import get_ink_value
+
+
+class DrawList:
+    """
+    Collects masks to be drawn and then composites all of them
+    onto an image in a single pass
+    """
+    def __init__(self):
+        self.masks: List[np.ndarray] = []
+        self.xs: List[int] = []
+        self.ys: List[int] = []
+
+    def add(self, mask: np.ndarray, x: int, y: int):
+        """Adds a mask with its upper left corner at the given position"""
+        self.masks.append(mask)
+        self.xs.append(x)
+        self.ys.append(y)
+
+    def composite(self, img: np.ndarray):
+        """
+        Draws all the masks onto the image. Masks are binary, so pixels
+        covered by any of them are simply set to the ink value of the image.
+        """
+        if len(self.masks) == 0:
+            return
+
+        ink = get_ink_value(img.dtype)
+
+        # clip all the masks at once
+        height, width = img.shape[0], img.shape[1]
+        xs = np.array(self.xs)
+        ys = np.array(self.ys)
+        widths = np.array([m.shape[1] for m in self.masks])
+        heights = np.array([m.shape[0] for m in self.masks])
+        x_from = np.clip(xs, 0, width)
+        x_to = np.clip(xs + widths, 0, width)
+        y_from = np.clip(ys, 0, height)
+        y_to = np.clip(ys + heights, 0, height)
+        mask_x = x_from - xs
+        mask_y = y_from - ys
+        visible = np.nonzero((x_from < x_to) & (y_from < y_to))[0]
+
+        rectangles = zip(
+            visible.tolist(),
+            x_from[visible].tolist(), x_to[visible].tolist(),
+            y_from[visible].tolist(), y_to[visible].tolist(),
+            mask_x[visible].tolist(), mask_y[visible].tolist()
+        )
+        for i, x0, x1, y0, y1, mx, my in rectangles:
+            view = img[y0:y1, x0:x1]
+            mask = self.masks[i][my:(my + y1 - y0), mx:(mx + x1 - x0)]
+            np.copyto(view, ink, where=mask.view(np.bool_))
+
+        self.masks = []
+        self.xs = []
+        self.ys = []
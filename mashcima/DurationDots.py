@@ -1,7 +1,6 @@
 from typing import Optional, List
 from mashcima.SymbolRepository import SymbolRepository
 from mashcima.canvas_items.CanvasItem import CanvasItem
-import copy
 import random
 
 
@@ -22,9 +21,9 @@ class DurationDots:
     def select_sprites(self, repo: SymbolRepository):
         if self.token is None:
             return
-        self.item.sprites.add("duration_dot", copy.deepcopy(random.choice(repo.DOTS)))
+        self.item.sprites.add("duration_dot", random.choice(repo.DOTS).copy())
         if self.token == "**":
-            self.item.sprites.add("duration_dot_2", copy.deepcopy(random.choice(repo.DOTS)))
+            self.item.sprites.add("duration_dot_2", random.choice(repo.DOTS).copy())
 
     def place_sprites(self):
         from mashcima.canvas_items.Note import Note  # prevent cyclic dependency
@@ -0,0 +1,217 @@
+import cv2
+import numpy as np
+from typing import List, Tuple, Optional
+from mashcima.Sprite import Sprite
+from mashcima.SpriteGroup import SpriteGroup
+from mashcima.DrawList import DrawList
+from mashcima.utils import draw_line, draw_polylines, fill_polygons
+
+
+# How many pixels around the needed region get rendered as well
+# (thick lines are drawn slightly differently when clipped by the image border)
+RENDER_MARGIN = 8
+
+
+class Scene:
+    """
+    Layout of a synthesized image, without any pixels drawn.
+    Sprites are referenced by their keys in the symbol repository, so the scene
+    can be rendered later (or in another process) with the same repository.
+    Positions are in the pixel space of the whole image with all the staves.
+    """
+    def __init__(self, width: int, height: int):
+        # size of the whole image
+        self.width = width
+        self.height = height
+
+        # top edges of the staff lines images (see generate_staff_lines)
+        self.staves: List[int] = []
+
+        # sprites as (sprite key, heights the mask is stretched to, x, y)
+        # with x, y being the upper left corner of the mask
+        # (see SymbolRepository.get_sprite_key)
+        self.sprites: List[Tuple[Tuple[str, int, Optional[str]], Tuple[int, ...], int, int]] = []
+
+        # beams, each as a list of polylines (one per beam level)
+        self.beams: List[List[List[Tuple[int, int]]]] = []
+
+        # straight lines as (x1, y1, x2, y2, thickness)
+        self.lines: List[Tuple[int, int, int, int, int]] = []
+
+        # slurs as three points they go through (x1, y1, x2, y2, x3, y3)
+        self.slurs: List[Tuple[int, int, int, int, int, int]] = []
+
+        # box [x, y, width, height] the image is cropped to
+        self.box: List[int] = [0, 0, width, height]
+
+        # affine transformation of the box, with the destination size
+        # (see transform_image.py, None if the box is only cropped)
+        self.matrix: Optional[np.ndarray] = None
+        self.dest_size: Optional[Tuple[int, int]] = None
+
+        # composite sprites in a single pass
+        # (set to False to render sprite by sprite, e.g. when debugging)
+        self.use_draw_list = True
+
+    def add_sprite(self, repo, sprite: Sprite, parent_x: int, parent_y: int):
+        """Adds a sprite, positioned like Sprite.render would draw it"""
+        if sprite.stretched_from is None:
+            key = repo.get_sprite_key(sprite.mask)
+            stretches = ()
+        else:
+            key = repo.get_sprite_key(sprite.stretched_from[0])
+            stretches = sprite.stretched_from[1]
+        self.sprites.append((
+            key,
+            stretches,
+            sprite.x + sprite.trim_left + parent_x,
+            sprite.y + sprite.trim_top + parent_y
+        ))
+
+    def add_sprite_group(self, repo, group: SpriteGroup):
+        """Adds sprites of a group, the way SpriteGroup.render draws them"""
+        for name, sprite in group.sprites.items():
+            if name not in group.stamped_names:
+                self.add_sprite(repo, sprite, group.position_x, group.position_y)
+        if group.stamp is not None:
+            self.add_sprite(repo, group.stamp, group.position_x, group.position_y)
+
+    def add_beam(self, chains: List[List[Tuple[int, int]]]):
+        self.beams.append([list(chain) for chain in chains])
+
+    def add_line(self, a: Tuple[int, int], b: Tuple[int, int], thickness: int):
+        self.lines.append((a[0], a[1], b[0], b[1], thickness))
+
+    def add_slur(
+            self,
+            start: Tuple[int, int],
+            center: Tuple[int, int],
+            end: Tuple[int, int]
+    ):
+        self.slurs.append((*start, *center, *end))
+
+    def get_region(self) -> List[int]:
+        """
+        Returns the region [x, y, width, height] of the whole image
+        that has to be rendered to produce the final image
+        """
+        from mashcima.transform_image import get_source_region
+        from mashcima.transform_image import get_prefilter_size
+
+        if self.matrix is not None:
+            return get_source_region(
+                self.matrix, self.dest_size, (self.height, self.width),
+                margin=RENDER_MARGIN + get_prefilter_size(self.matrix)
+            )
+
+        box = self.box
+        left = min(max(box[0] - RENDER_MARGIN, 0), self.width)
+        top = min(max(box[1] - RENDER_MARGIN, 0), self.height)
+        right = min(box[0] + box[2] + RENDER_MARGIN, self.width)
+        bottom = min(box[1] + box[3] + RENDER_MARGIN, self.height)
+        return [left, top, right - left, bottom - top]
+
+    def render(self, repo, output_dtype=None) -> np.ndarray:
+        """
+        Renders the final image (cropped or transformed), only the region
+        of the whole image that ends up in the final image is drawn
+        """
+        from mashcima.generate_staff_lines import generate_staff_lines
+        from mashcima.generate_staff_lines import get_staff_lines_columns
+        from mashcima.transform_image import apply_transformation
+        from mashcima.transform_image import get_prefilter_size
+
+        if output_dtype is None:
+            output_dtype = np.float32
+
+        region = self.get_region()
+        img = np.zeros(shape=(region[3], region[2]), dtype=output_dtype)
+
+        # draw staff lines
+        staff_img, _ = generate_staff_lines(repo.CONFIG, output_dtype)
+        for top in self.staves:
+            y_from = max(top, region[1])
+            y_to = min(top + staff_img.shape[0], region[1] + region[3])
+            if y_from >= y_to:
+                continue
+            img[(y_from - region[1]):(y_to - region[1]), :] = get_staff_lines_columns(
+                staff_img[(y_from - top):(y_to - top), :],
+                region[0],
+                region[2]
+            )
+
+        # draw symbols
+        self.render_onto(repo, img, (region[0], region[1]))
+
+        # transform or just crop
+        if self.matrix is not None:
+            # (when the image shrinks, strokes are averaged before sampling)
+            prefilter_size = get_prefilter_size(self.matrix)
+            if prefilter_size > 1:
+                cv2.blur(img, (prefilter_size, prefilter_size), dst=img)
+            return apply_transformation(
+                img, self.matrix, self.dest_size, offset=(region[0], region[1])
+            )
+        x = self.box[0] - region[0]
+        y = self.box[1] - region[1]
+        return img[y:(y + self.box[3]), x:(x + self.box[2])]
+
+    def render_onto(
+            self,
+            repo,
+            img: np.ndarray,
+            offset: Tuple[int, int] = (0, 0)
+    ):
+        """
+        Draws sprites, lines and slurs onto an image,
+        the offset is the position of the image within the whole image
+        """
+        from mashcima.Slur import get_slur_points, SLUR_THICKNESS
+        from mashcima.Beam import get_beam_polygons
+
+        ox, oy = offset
+
+        # sprites are clipped and composited in a single pass,
+        # sprites outside of the image are skipped before being stretched
+        # (a stretched mask is at most as tall as the last target height)
+        height, width = img.shape[0], img.shape[1]
+        draw_list = DrawList()
+        for key, stretches, x, y in self.sprites:
+            sprite = repo.get_sprite(key)
+            x, y = x - ox, y - oy
+            sprite_height = stretches[-1] if len(stretches) > 0 else sprite.mask.shape[0]
+            if x >= width or y >= height \
+                    or x + sprite.mask.shape[1] <= 0 or y + sprite_height <= 0:
+                continue
+            if len(stretches) > 0:
+                sprite = sprite.copy()
+                for target_height in stretches:
+                    sprite.stretch_height(target_height)
+            if self.use_draw_list:
+                draw_list.add(sprite.mask, x, y)
+            else:
+                sprite.render(
+                    img,
+                    x - sprite.x - sprite.trim_left,
+                    y - sprite.y - sprite.trim_top
+                )
+        draw_list.composite(img)
+
+        # (polygons of a beam do not overlap, so each beam is filled
+        # in one call, but different beams may overlap)
+        for chains in self.beams:
+            fill_polygons(img, get_beam_polygons(chains, offset))
+
+        for x1, y1, x2, y2, thickness in self.lines:
+            draw_line(img, (x1 - ox, y1 - oy), (x2 - ox, y2 - oy), thickness)
+
+        # (slur points are computed in the whole image, so that
+        # the rounding does not depend on the rendered region)
+        draw_polylines(
+            img,
+            [
+                get_slur_points((x1, y1), (x2, y2), (x3, y3)) - [ox, oy]
+                for x1, y1, x2, y2, x3, y3 in self.slurs
+            ],
+            SLUR_THICKNESS
+        )
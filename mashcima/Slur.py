@@ -1,8 +1,11 @@
 import numpy as np
-import cv2
 import random
 from mashcima.canvas_items.SlurableItem import SlurableItem
 from mashcima.canvas_items.StemNote import StemNote
+from typing import Tuple, Optional
+
+
+SLUR_THICKNESS = 3
 
 
 class Slur:
@@ -17,6 +20,9 @@ class Slur:
         # or below-note to below-note
         self.tail_to_tail = True
 
+        # points the slur goes through in pixel space (see place)
+        self.control_points: Optional[Tuple[Tuple[int, int], ...]] = None
+
     def _set_is_flipped(self):
         # both ends have a stem
         if isinstance(self.start_item, StemNote) and isinstance(self.end_item, StemNote):
@@ -53,12 +59,12 @@ class Slur:
         self.flipped = random.choice([True, False])
         return
 
-    def render(self, img: np.ndarray):
-        slur_thickness = 3
-
-        # NOTE: the slur is rendered as a parabola going through 3 points
-        # (two attachments and one center point)
-
+    def place(self):
+        """
+        Called after items have been placed, computes the three points
+        the slur goes through in canvas pixel space
+        (two attachments and one center point)
+        """
         self._set_is_flipped()
         start_attachment = self.start_item.get_slur_start_attachment_point(self)
         end_attachment = self.end_item.get_slur_end_attachment_point(self)
@@ -72,29 +78,34 @@ class Slur:
         center_point[1] += (-1 if self.flipped else 1) * min(int(width / 5), 20)
         center_point = tuple(center_point)
 
-        # calculate coefficients a of: y = ax^2 +bx +c
-        A = np.array([
-            [start_attachment[0] ** 2, start_attachment[0], 1],
-            [center_point[0] ** 2, center_point[0], 1],
-            [end_attachment[0] ** 2, end_attachment[0], 1]
-        ])
-        v = np.array([
-            [start_attachment[1]],
-            [center_point[1]],
-            [end_attachment[1]]
-        ])
-        try:
-            abc = np.linalg.inv(A).dot(v)
-        except:
-            print("Slur didn't render - singular matrix")
-            return
-        f = lambda x: abc[0] * x**2 + abc[1] * x + abc[2]
-
-        for x in range(start_attachment[0], end_attachment[0]):
-            cv2.line(
-                img,
-                (x, int(f(x))),
-                (x + 1, int(f(x + 1))),
-                thickness=slur_thickness,
-                color=1
-            )
+        self.control_points = (start_attachment, center_point, end_attachment)
+
+    def add_to_scene(self, scene):
+        scene.add_slur(*self.control_points)
+
+
+def get_slur_points(
+        start: Tuple[int, int],
+        center: Tuple[int, int],
+        end: Tuple[int, int]
+) -> np.ndarray:
+    """
+    Returns points of a slur, a parabola going through the 3 given points,
+    as an array of [x, y] rows, one for each x from the start to the end
+    """
+    x0, y0 = start
+    x1, y1 = center
+    x2, y2 = end
+    if x0 == x1 or x1 == x2 or x0 == x2:
+        print("Slur didn't render - singular matrix")
+        return np.zeros(shape=(0, 2), dtype=np.int32)
+
+    # Newton form of the parabola: y = y0 + d1 (x - x0) + d2 (x - x0)(x - x1)
+    # (relative to the start, so it stays precise for large x)
+    d1 = (y1 - y0) / (x1 - x0)
+    d2 = ((y2 - y1) / (x2 - x1) - d1) / (x2 - x0)
+
+    x = np.arange(x0, x2 + 1, dtype=np.int32)
+    dx = (x - x0).astype(np.float64)
+    y = y0 + dx * (d1 + d2 * (dx - (x1 - x0)))
+    return np.stack([x, y.astype(np.int32)], axis=1)
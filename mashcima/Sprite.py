@@ -1,11 +1,87 @@
 import numpy as np
-import cv2
+import copy
+from collections import OrderedDict
+from mashcima.utils import get_ink_value
+from typing import Optional, Dict, Tuple
 
 
 PRINT_WARNINGS_DEFAULT = False
 
+# How many stretched masks to remember. Stretched masks are shared by all
+# sprites in the process and the least recently used ones are dropped.
+STRETCH_CACHE_SIZE = 1024
+
+# (id of the source mask, trimmed rows, target height)
+#     -> (source mask, stretched mask, trimmed rows of the stretched mask)
+# (the source mask is kept so that its id cannot get reused)
+_stretch_cache = OrderedDict()
+_stretch_cache_counters = {"hits": 0, "misses": 0}
+
+
+def get_stretch_cache_info() -> Dict[str, int]:
+    """Returns hit and miss counts of the stretched masks cache"""
+    return {
+        "hits": _stretch_cache_counters["hits"],
+        "misses": _stretch_cache_counters["misses"],
+        "size": len(_stretch_cache),
+        "max_size": STRETCH_CACHE_SIZE
+    }
+
+
+def clear_stretch_cache():
+    """Drops all stretched masks and resets the counters"""
+    _stretch_cache.clear()
+    _stretch_cache_counters["hits"] = 0
+    _stretch_cache_counters["misses"] = 0
+
+
+def _stretch_mask_height(
+        mask: np.ndarray,
+        trim_top: int,
+        trim_bottom: int,
+        target_height: int
+) -> Tuple[np.ndarray, int, int]:
+    """
+    Stretches a trimmed mask as if the trimmed rows were still there
+    (nearest neighbour, the same rows cv2.resize would pick),
+    returns the stretched mask with its trimmed rows (top, bottom)
+    """
+    key = (id(mask), trim_top, trim_bottom, target_height)
+    entry = _stretch_cache.get(key)
+    if entry is not None and entry[0] is mask:
+        _stretch_cache.move_to_end(key)
+        _stretch_cache_counters["hits"] += 1
+        return entry[1]
+
+    _stretch_cache_counters["misses"] += 1
+    # source row for each target row, computed like cv2.resize does
+    height = trim_top + mask.shape[0] + trim_bottom
+    scale = 1.0 / (target_height / height)
+    rows = np.minimum(
+        np.floor(np.arange(target_height) * scale),
+        height - 1
+    ).astype(np.int64)
+    start = int(np.searchsorted(rows, trim_top))
+    end = int(np.searchsorted(rows, trim_top + mask.shape[0]))
+    stretched = mask[rows[start:end] - trim_top, :]
+    stretched.flags.writeable = False
+    result = (stretched, start, target_height - end)
+
+    _stretch_cache[key] = (mask, result)
+    _stretch_cache.move_to_end(key)
+    while len(_stretch_cache) > STRETCH_CACHE_SIZE:
+        _stretch_cache.popitem(last=False)
+    return result
+
 
 class Sprite:
+    __slots__ = (
+        "x", "y", "mask",
+        "trim_top", "trim_left", "trim_bottom", "trim_right",
+        "stretched_from",
+        "print_render_warnings", "source_document", "source_writer"
+    )
+
     def __init__(
             self,
             x: int,
@@ -17,18 +93,40 @@ class Sprite:
         self.x = x
         self.y = y
 
-        # the actual mask to be printed (image data)
-        self.mask = mask.astype(dtype=np.float32)
+        # the actual mask to be printed (binary image data, 0 or 1)
+        # (shared between copies, so it's never modified in place,
+        # only replaced by a new array)
+        # given masks are binarized, pixels above one half become ink,
+        # so boolean, [0, 1] float and 0/255 masks all work
+        self.mask = (mask > 0.5).astype(dtype=np.uint8)
+        self.mask.flags.writeable = False
+
+        # empty rows and columns trimmed off the mask by trim(),
+        # they still count towards the sprite size
+        self.trim_top = 0
+        self.trim_left = 0
+        self.trim_bottom = 0
+        self.trim_right = 0
+
+        # the mask before stretch_height was called and all the heights
+        # it has been stretched to since (None if not stretched),
+        # so that scenes can refer to the stretched mask
+        self.stretched_from: Optional[Tuple[np.ndarray, Tuple[int, ...]]] = None
 
         self.print_render_warnings = print_render_warnings
 
+        # where the symbol was extracted from
+        # (None for default symbols)
+        self.source_document: Optional[str] = None
+        self.source_writer: Optional[int] = None
+
     @property
     def width(self):
-        return self.mask.shape[1]
+        return self.trim_left + self.mask.shape[1] + self.trim_right
 
     @property
     def height(self):
-        return self.mask.shape[0]
+        return self.trim_top + self.mask.shape[0] + self.trim_bottom
 
     @property
     def left(self):
@@ -46,21 +144,55 @@ class Sprite:
     def bottom(self):
         return self.y + self.height
 
+    def copy(self):
+        """Returns a copy with its own position, sharing the mask"""
+        return copy.copy(self)
+
+    def trim(self):
+        """Crops the mask to its non-zero extent, keeping the sprite size"""
+        rows = np.nonzero(self.mask.any(axis=1))[0]
+        columns = np.nonzero(self.mask.any(axis=0))[0]
+        if len(rows) == 0:
+            return  # nothing to trim to
+        top, bottom = rows[0], rows[-1] + 1
+        left, right = columns[0], columns[-1] + 1
+        if bottom - top == self.mask.shape[0] \
+                and right - left == self.mask.shape[1]:
+            return  # already tight
+        self.trim_top += int(top)
+        self.trim_left += int(left)
+        self.trim_bottom += int(self.mask.shape[0] - bottom)
+        self.trim_right += int(self.mask.shape[1] - right)
+        self.mask = self.mask[top:bottom, left:right].copy()
+        self.mask.flags.writeable = False
+
     def flip(self):
-        self.x = -self.x - self.mask.shape[1]
-        self.y = -self.y - self.mask.shape[0]
+        self.x = -self.x - self.width
+        self.y = -self.y - self.height
         self.mask = np.rot90(np.rot90(self.mask))
+        self.trim_top, self.trim_bottom = self.trim_bottom, self.trim_top
+        self.trim_left, self.trim_right = self.trim_right, self.trim_left
+
+    def flip_horizontally(self):
+        """Mirrors the mask, keeping the position"""
+        self.mask = np.flip(self.mask, axis=1)
+        self.trim_left, self.trim_right = self.trim_right, self.trim_left
 
     def stretch_height(self, target_height: int):
-        self.mask = cv2.resize(
-            self.mask,
-            (self.width, target_height),
-            interpolation=cv2.INTER_NEAREST
+        if self.stretched_from is None:
+            self.stretched_from = (self.mask, (target_height,))
+        else:
+            self.stretched_from = (
+                self.stretched_from[0],
+                self.stretched_from[1] + (target_height,)
+            )
+        self.mask, self.trim_top, self.trim_bottom = _stretch_mask_height(
+            self.mask, self.trim_top, self.trim_bottom, target_height
         )
 
     def render(self, img: np.ndarray, parent_x: int, parent_y: int):
-        x = self.x + parent_x
-        y = self.y + parent_y
+        x = self.x + self.trim_left + parent_x
+        y = self.y + self.trim_top + parent_y
         mask = self.mask
 
         # following code is copied from a helper method and
@@ -95,8 +227,10 @@ class Sprite:
             mask = mask[:(mask.shape[0] - (y_to - img.shape[0])), :]
             y_to = img.shape[0]
 
+        # the mask gets converted to the image dtype only here
+        ink = get_ink_value(img.dtype)
         try:
-            img[y_from:y_to, x_from:x_to] += (1 - img[y_from:y_to, x_from:x_to]) * mask
+            img[y_from:y_to, x_from:x_to] += (ink - img[y_from:y_to, x_from:x_to]) * mask
         except ValueError:
             # NOTE: this is not a warning, this is bad, so print always
             if PRINT_WARNINGS_DEFAULT:
@@ -104,6 +238,9 @@ class Sprite:
 
     def inspect(self) -> np.ndarray:
         from mashcima.debug import draw_cross
-        img = self.mask.copy()
+        img = np.pad(
+            self.mask.astype(dtype=np.float32),
+            ((self.trim_top, self.trim_bottom), (self.trim_left, self.trim_right))
+        )
         draw_cross(img, -self.left, -self.top, size=5, thickness=1)
         return img
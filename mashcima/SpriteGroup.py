@@ -1,11 +1,19 @@
 from mashcima.Sprite import Sprite
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional
 import numpy as np
 import copy
 
 
 class SpriteGroup:
     """A collection of sprites placed around an origin"""
+    __slots__ = (
+        "position_x", "position_y",
+        "padding_top", "padding_bottom", "padding_left", "padding_right",
+        "top", "left", "bottom", "right", "width", "height",
+        "sprites", "points", "stamp", "stamped_names",
+        "source_document", "source_writer"
+    )
+
     def __init__(self):
         # position of this group's origin
         self.position_x = 0
@@ -33,6 +41,16 @@ class SpriteGroup:
         # (points do not contribute to bounding box)
         self.points: Dict[str, Tuple[int, int]] = {}
 
+        # single sprite pre-composited from some of the sprites,
+        # that is drawn instead of them (see create_stamp)
+        self.stamp: Optional[Sprite] = None
+        self.stamped_names: Tuple[str, ...] = ()
+
+        # where the symbol was extracted from
+        # (None for default symbols)
+        self.source_document: Optional[str] = None
+        self.source_writer: Optional[int] = None
+
     def add(self, name: str, sprite: Sprite):
         self.sprites[name] = sprite
         return self  # make it chainable
@@ -55,9 +73,9 @@ class SpriteGroup:
             self.right = 0
         else:
             self.left = min([s.x for s in self.sprites.values()])
-            self.right = max([s.x + s.mask.shape[1] for s in self.sprites.values()])
+            self.right = max([s.x + s.width for s in self.sprites.values()])
             self.top = min([s.y for s in self.sprites.values()])
-            self.bottom = max([s.y + s.mask.shape[0] for s in self.sprites.values()])
+            self.bottom = max([s.y + s.height for s in self.sprites.values()])
 
         self.right += self.padding_right
         self.bottom += self.padding_bottom
@@ -68,9 +86,56 @@ class SpriteGroup:
         self.width = self.right - self.left
         self.height = self.bottom - self.top
 
+    def copy(self):
+        """
+        Returns a copy that can be repositioned and modified independently,
+        while sprite masks are shared (they are never modified in place)
+        """
+        cp = copy.copy(self)
+        cp.sprites = {name: s.copy() for name, s in self.sprites.items()}
+        cp.points = dict(self.points)
+        return cp
+
+    def create_stamp(self, names: Optional[List[str]] = None):
+        """
+        Composites given sprites (all by default) into a single stamp
+        sprite, so that they get drawn in one blit. The sprites stay
+        in the group (for layout), but must not change, otherwise
+        the stamp has to be removed first.
+        """
+        if names is None:
+            names = list(self.sprites.keys())
+        names = [n for n in names if n in self.sprites]
+        if len(names) == 0:
+            return self
+        sprites = [self.sprites[n] for n in names]
+
+        # ink extents of the sprites
+        left = min([s.x + s.trim_left for s in sprites])
+        top = min([s.y + s.trim_top for s in sprites])
+        right = max([s.x + s.trim_left + s.mask.shape[1] for s in sprites])
+        bottom = max([s.y + s.trim_top + s.mask.shape[0] for s in sprites])
+
+        mask = np.zeros(shape=(bottom - top, right - left), dtype=np.uint8)
+        for s in sprites:
+            x = s.x + s.trim_left - left
+            y = s.y + s.trim_top - top
+            view = mask[y:(y + s.mask.shape[0]), x:(x + s.mask.shape[1])]
+            np.maximum(view, s.mask, out=view)
+
+        self.stamp = Sprite(left, top, mask)
+        self.stamped_names = tuple(names)
+        return self  # make it chainable
+
+    def remove_stamp(self):
+        """Removes the stamp, so that sprites get drawn one by one again"""
+        self.stamp = None
+        self.stamped_names = ()
+
     def create_flipped_copy(self, names: List[str] = None):
         """Returns a flipped copy of this item"""
-        cp = copy.deepcopy(self)
+        cp = self.copy()
+        cp.remove_stamp()
 
         if names is None:
             names = list(cp.sprites.keys()) + list(cp.points.keys())
@@ -89,7 +154,10 @@ class SpriteGroup:
         return cp
 
     def render(self, img: np.ndarray):
-        for sprite in self.sprites.values():
+        sprites = [s for n, s in self.sprites.items() if n not in self.stamped_names]
+        if self.stamp is not None:
+            sprites = [self.stamp] + sprites
+        for sprite in sprites:
             sprite.render(img, self.position_x, self.position_y)
 
     def inspect(self) -> np.ndarray:
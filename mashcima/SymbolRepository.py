@@ -1,37 +1,189 @@
 import os
 import re
-from muscima.io import parse_cropobject_list, CropObject
+import gc
 import itertools
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, TYPE_CHECKING
 from mashcima.Sprite import Sprite
 from mashcima.SpriteGroup import SpriteGroup
 import cv2
+import numpy as np
 import pickle
+import zlib
+import multiprocessing
 from mashcima.Config import Config
-import tqdm
-
-
-def _restore_documents_from_cache(config: Config):
-    # if the cache exists, just restore them
-    if os.path.isfile(config.MUSCIMA_PP_DOCUMENTS_CACHE_PATH):
-        return pickle.load(open(config.MUSCIMA_PP_DOCUMENTS_CACHE_PATH, "rb"))
-
-    # else create the cache
-    print("Caching MUSCIMA++ documents...")
-    document_names = os.listdir(config.MUSCIMA_PP_CROP_OBJECT_DIRECTORY)
-    progress_bar = tqdm.tqdm(total=len(document_names), unit='doc', unit_scale=True)
-    documents = []
-    for i, doc in enumerate(document_names):
-        documents.append(
-            parse_cropobject_list(
-                os.path.join(config.MUSCIMA_PP_CROP_OBJECT_DIRECTORY, doc)
-            )
-        )
-        progress_bar.update()
-    pickle.dump(documents, open(config.MUSCIMA_PP_DOCUMENTS_CACHE_PATH, "wb"))
-    progress_bar.close()
-    print("Done.")
-    return documents
+from mashcima.compiled_repository import get_compiled_repository_path
+from mashcima.compiled_repository import load_compiled_repository
+from mashcima.compiled_repository import save_compiled_repository
+
+if TYPE_CHECKING:
+    from muscima.io import CropObject
+
+
+def _get_start_method() -> str:
+    """
+    Returns the start method of new processes without fixing it,
+    so that the application can still call set_start_method later
+    """
+    method = multiprocessing.get_start_method(allow_none=True)
+    if method is None:
+        # the first supported method is the platform default
+        method = multiprocessing.get_all_start_methods()[0]
+    return method
+
+
+def _get_parsing_worker_count(config: Config) -> int:
+    """Resolves how many processes should parse MUSCIMA++ XML files"""
+    if config.PARSING_WORKERS is not None:
+        return max(config.PARSING_WORKERS, 1)
+
+    # Spawned processes re-import the main script, which would break
+    # scripts without the __main__ guard, so parallelize by default
+    # only where processes are forked.
+    if _get_start_method() != "fork":
+        return 1
+    return os.cpu_count() or 1
+
+
+def _get_resident_memory() -> Optional[int]:
+    """Returns the resident memory of this process in bytes
+    (None where /proc is not available)"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _get_writer(document_name: str) -> int:
+    m = re.search(r"^CVC-MUSCIMA_W-(\d+)", document_name)
+    assert m is not None
+    return int(m.group(1))
+
+
+def _dump_atomically(obj, path: str):
+    """Pickles an object so that no partially written file can ever appear"""
+    tmp_path = path + ".tmp." + str(os.getpid())
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _restore_documents_index(config: Config) -> List[Dict]:
+    """
+    Returns the index of MUSCIMA++ documents (name and writer of each)
+    sorted by document name
+    """
+    index_path = os.path.join(config.MUSCIMA_PP_DOCUMENTS_CACHE_DIRECTORY, "index.pkl")
+    if os.path.isfile(index_path):
+        with open(index_path, "rb") as f:
+            return pickle.load(f)
+
+    index = [
+        {
+            "document": os.path.splitext(file_name)[0],
+            "writer": _get_writer(file_name)
+        }
+        for file_name in sorted(os.listdir(config.MUSCIMA_PP_CROP_OBJECT_DIRECTORY))
+        if file_name.endswith(".xml")
+    ]
+    os.makedirs(config.MUSCIMA_PP_DOCUMENTS_CACHE_DIRECTORY, exist_ok=True)
+    _dump_atomically(index, index_path)
+    return index
+
+
+def _restore_document_shard(config: Config, document: str) -> Optional[List["CropObject"]]:
+    """Loads crop objects of one document from its cache shard"""
+    shard_path = os.path.join(config.MUSCIMA_PP_DOCUMENTS_CACHE_DIRECTORY, document + ".pkl")
+    if not os.path.isfile(shard_path):
+        return None
+    try:
+        with open(shard_path, "rb") as f:
+            return pickle.load(f)
+    except (pickle.UnpicklingError, EOFError):
+        return None  # will be parsed again
+
+
+def _filter_documents(
+        index: List[Dict],
+        documents: Optional[List[str]],
+        take_writers: Optional[List[int]],
+        skip_writers: Optional[List[int]]
+) -> List[Dict]:
+    """Returns index entries of documents that pass the given filters"""
+    # filter documents by exact nameset
+    if documents is not None:
+        index = [d for d in index if d["document"] + ".xml" in documents]
+
+    # filter documents by other conditions
+    if skip_writers is not None:
+        index = [d for d in index if d["writer"] not in skip_writers]
+
+    if take_writers is not None:
+        index = [d for d in index if d["writer"] in take_writers]
+
+    return index
+
+
+def _restore_documents_from_cache(
+        config: Config,
+        index: List[Dict]
+) -> List[List["CropObject"]]:
+    """
+    Loads given documents. Each document is cached in its own shard,
+    so only the requested shards are read. Missing shards are created
+    by parsing the corresponding XML files.
+    """
+    # restore cached shards
+    loaded: Dict[str, List["CropObject"]] = {}
+    for d in index:
+        shard = _restore_document_shard(config, d["document"])
+        if shard is not None:
+            loaded[d["document"]] = shard
+
+    # parse the rest and create their shards
+    missing = [d["document"] for d in index if d["document"] not in loaded]
+    if len(missing) > 0:
+        # imported only here, since parsing is needed just once
+        import tqdm
+        from muscima.io import parse_cropobject_list
+
+        print("Caching MUSCIMA++ documents...")
+        paths = [
+            os.path.join(config.MUSCIMA_PP_CROP_OBJECT_DIRECTORY, doc + ".xml")
+            for doc in missing
+        ]
+
+        # (an explicit context, so that the default one does not get fixed
+        # and the application can still set the start method later,
+        # tqdm would otherwise create its lock from the default context)
+        context = multiprocessing.get_context(_get_start_method())
+        if not hasattr(tqdm.tqdm, "_lock"):
+            tqdm.tqdm.set_lock(context.RLock())
+        progress_bar = tqdm.tqdm(total=len(missing), unit='doc', unit_scale=True)
+
+        def _store_shard(document: str, crop_objects: List["CropObject"]):
+            loaded[document] = crop_objects
+            _dump_atomically(crop_objects, os.path.join(
+                config.MUSCIMA_PP_DOCUMENTS_CACHE_DIRECTORY, document + ".pkl"
+            ))
+            progress_bar.update()
+
+        workers = min(_get_parsing_worker_count(config), len(missing))
+        if workers > 1:
+            # imap keeps the order of documents regardless of the worker count
+            with context.Pool(workers) as pool:
+                parsed = pool.imap(parse_cropobject_list, paths)
+                for document, crop_objects in zip(missing, parsed):
+                    _store_shard(document, crop_objects)
+        else:
+            for document, path in zip(missing, paths):
+                _store_shard(document, parse_cropobject_list(path))
+        progress_bar.close()
+        print("Done.")
+
+    # skip documents with no objects
+    return [loaded[d["document"]] for d in index if len(loaded[d["document"]]) > 0]
 
 
 class SymbolRepository:
@@ -44,12 +196,71 @@ class SymbolRepository:
             SymbolRepository.DEFAULT_REPOSITORY = SymbolRepository()
         return SymbolRepository.DEFAULT_REPOSITORY
 
+    # Functions from get_symbols.py and the symbol lists they extract.
+    # Lists are extracted lazily, on first access, by the whole group.
+    SYMBOL_EXTRACTORS = {
+        "get_whole_notes": ["WHOLE_NOTES"],
+        "get_half_notes": ["HALF_NOTES"],
+        "get_quarter_notes": ["QUARTER_NOTES"],
+        "get_eighth_notes": ["EIGHTH_NOTES"],
+        "get_sixteenth_notes": ["SIXTEENTH_NOTES"],
+        "get_longa_rests": ["LONGA_RESTS"],
+        "get_breve_rests": ["BREVE_RESTS"],
+        "get_whole_rests": ["WHOLE_RESTS"],
+        "get_half_rests": ["HALF_RESTS"],
+        "get_quarter_rests": ["QUARTER_RESTS"],
+        "get_eighth_rests": ["EIGHTH_RESTS"],
+        "get_sixteenth_rests": ["SIXTEENTH_RESTS"],
+        "get_accidentals": ["SHARPS", "FLATS", "NATURALS"],
+        "get_dots": ["DOTS"],
+        "get_ledger_lines": ["LEDGER_LINES"],
+        "get_barlines": ["BAR_LINES", "TALL_BAR_LINES"],
+        "get_g_clefs": ["G_CLEFS"],
+        "get_f_clefs": ["F_CLEFS"],
+        "get_c_clefs": ["C_CLEFS"],
+        "get_time_marks": ["TIME_MARKS"],
+    }
+
+    # names of all the symbol lists extracted by the repository
+    SYMBOL_LISTS = [
+        name for names in SYMBOL_EXTRACTORS.values() for name in names
+    ]
+
+    # note lists that are also kept flipped upside-down (stem pointing
+    # the other way), index by index, under the given names
+    FLIPPED_LISTS = {
+        "HALF_NOTES": "HALF_NOTES_FLIPPED",
+        "QUARTER_NOTES": "QUARTER_NOTES_FLIPPED",
+        "EIGHTH_NOTES": "EIGHTH_NOTES_FLIPPED",
+        "SIXTEENTH_NOTES": "SIXTEENTH_NOTES_FLIPPED",
+    }
+
+    # symbol lists together with the flipped ones
+    _ALL_LISTS = SYMBOL_LISTS + list(FLIPPED_LISTS.values())
+
+    # name of the stamp in sprite keys (see get_sprite_key)
+    STAMP_SPRITE_NAME = "<stamp>"
+
+    # lookups of sprite keys, created on first use
+    _SPRITE_KEY_DATA = [
+        "_sprites_by_key", "_sprite_keys", "_keys_by_list", "_list_fingerprints"
+    ]
+
+    # raw MUSCIMA++ data, loaded only when some symbols need extracting
+    RAW_DATA = [
+        "DOCUMENTS", "CROP_OBJECTS", "CROP_OBJECT_LOOKUP_DICTS",
+        "CROP_OBJECTS_BY_CLSNAME", "CROP_OBJECT_OUTLINKS"
+    ]
+
     def __init__(
             self,
             documents: List[str] = None,
             take_writers: Optional[List[int]] = None,
             skip_writers: Optional[List[int]] = None,
-            config=None
+            config=None,
+            use_compiled_cache: bool = True,
+            lean: bool = False,
+            stamp_notes: bool = False
     ):
         if config is None:
             config = Config.load_default()
@@ -58,168 +269,397 @@ class SymbolRepository:
         # through this instance
         self.CONFIG = config
 
-        print("Loading symbols...")
-
-        ##############################
-        # Load and prepare MUSCIMA++ #
-        ##############################
-
-        self.DOCUMENTS =_restore_documents_from_cache(config)
-
-        # filter documents by exact nameset
-        if documents is not None:
-            self.DOCUMENTS = list(filter(
-                lambda d: d[0].doc + ".xml" in documents,
-                self.DOCUMENTS
-            ))
+        # documents the symbols are taken from
+        self._document_index = _filter_documents(
+            _restore_documents_index(config),
+            documents, take_writers, skip_writers
+        )
 
-        # filter documents by other conditions
-        def _get_writer(document_name: str) -> int:
-            m = re.search("^CVC-MUSCIMA_W-(\d+)", document_name)
-            assert m is not None
-            return int(m.group(1))
+        # names of the documents
+        # (used for resolving document index from document name)
+        self.DOCUMENT_NAMES = [d["document"] for d in self._document_index]
 
-        if skip_writers is not None:
-            self.DOCUMENTS = list(filter(
-                lambda d: _get_writer(d[0].doc) not in skip_writers,
-                self.DOCUMENTS
-            ))
+        # where to store and restore already extracted symbols
+        self._use_compiled_cache = use_compiled_cache
+        self._compiled_path = get_compiled_repository_path(
+            config, documents, take_writers, skip_writers
+        )
 
-        if take_writers is not None:
-            self.DOCUMENTS = list(filter(
-                lambda d: _get_writer(d[0].doc) in take_writers,
-                self.DOCUMENTS
-            ))
+        # repository that symbols are derived from, instead of extracting
+        # (set for repositories created by the subset method)
+        self._parent: Optional[SymbolRepository] = None
+
+        # composite sprites of notes into single stamps,
+        # so that notes get drawn in one blit
+        self._stamp_notes = stamp_notes
+
+        # lean repository extracts all symbols right away
+        # and then drops the raw MUSCIMA++ data
+        if lean:
+            self.release_raw_data()
+
+    def __getattr__(self, name: str):
+        # called only for attributes that have not been set yet,
+        # so this is where symbol lists and raw data get loaded lazily
+        for original, flipped in SymbolRepository.FLIPPED_LISTS.items():
+            if name == flipped:
+                getattr(self, original)
+                return self.__dict__[name]
+        if name in SymbolRepository.SYMBOL_LISTS:
+            for extractor, names in SymbolRepository.SYMBOL_EXTRACTORS.items():
+                if name in names:
+                    self._load_symbols(extractor)
+            return self.__dict__[name]
+        if name in SymbolRepository.RAW_DATA:
+            self._load_documents()
+            return self.__dict__[name]
+        if name in SymbolRepository._SPRITE_KEY_DATA:
+            self._init_sprite_keys()
+            return self.__dict__[name]
+        raise AttributeError(
+            "'SymbolRepository' object has no attribute '" + name + "'"
+        )
 
-        # names of the documents
-        # (used for resolving document index from document name)
-        self.DOCUMENT_NAMES = [doc[0].doc for doc in self.DOCUMENTS]
+    def load_all_symbols(self):
+        """Loads all symbol lists at once, instead of on first access"""
+        for name in SymbolRepository.SYMBOL_LISTS:
+            getattr(self, name)
+
+    def get_sprite_key(self, mask: np.ndarray) -> Tuple[str, int, Optional[str]]:
+        """
+        Returns the key of a sprite mask from this repository, as
+        (symbol list name, item index, sprite name in the group or None).
+        Keys are assigned when a symbol list gets loaded, so they are stable
+        for repositories loaded from the same compiled repository.
+        """
+        key = self._sprite_keys.get(id(mask))
+        if key is None:
+            # symbol lists assigned from outside are indexed on demand
+            for name in list(self.__dict__.keys()):
+                if name in SymbolRepository._ALL_LISTS:
+                    self._index_symbols(name, self.__dict__[name])
+            key = self._sprite_keys.get(id(mask))
+        if key is None:
+            raise Exception("The mask does not belong to this repository")
+        return key
+
+    def get_sprite(self, key: Tuple[str, int, Optional[str]]) -> Sprite:
+        """Returns a sprite by its key (it must not be modified)"""
+        if key not in self._sprites_by_key:
+            getattr(self, key[0].split(":")[0])  # loads the symbol list
+        sprite = self._sprites_by_key.get(key)
+        if sprite is None:
+            raise Exception("No sprite " + str(key) + " in this repository")
+        return sprite
+
+    def get_symbol_list_fingerprint(self, list_name: str) -> int:
+        """
+        Returns a 32 bit checksum of sprite sizes and masks of a symbol list
+        (as named in sprite keys), used to check that sprite keys
+        refer to the same sprites
+        """
+        if list_name not in self._list_fingerprints:
+            getattr(self, list_name.split(":")[0])  # loads the symbol list
+            keys = self._keys_by_list.get(list_name, [])
+            checksum = len(keys)
+            for key in keys:
+                mask = self._sprites_by_key[key].mask
+                shape = np.array(mask.shape, dtype=np.uint32)
+                checksum = zlib.crc32(shape.tobytes(), checksum)
+                checksum = zlib.crc32(np.ascontiguousarray(mask).tobytes(), checksum)
+            self._list_fingerprints[list_name] = checksum
+        return self._list_fingerprints[list_name]
+
+    def _index_symbols(self, name: str, symbols):
+        """Assigns keys to all sprites of a symbol list (and to stamps)"""
+        if isinstance(symbols, dict):
+            for key in symbols:
+                self._index_symbols(name + ":" + key, symbols[key])
+            return
+
+        keys = []
+
+        def _add(key: Tuple[str, int, Optional[str]], sprite: Sprite):
+            keys.append(key)
+            self._sprites_by_key[key] = sprite
+            self._sprite_keys.setdefault(id(sprite.mask), key)
+
+        for index, item in enumerate(symbols):
+            if isinstance(item, Sprite):
+                _add((name, index, None), item)
+                continue
+            for sprite_name, sprite in item.sprites.items():
+                _add((name, index, sprite_name), sprite)
+            if item.stamp is not None:
+                _add((name, index, SymbolRepository.STAMP_SPRITE_NAME), item.stamp)
+
+        self._keys_by_list[name] = keys
+        self._list_fingerprints.pop(name, None)
+
+    def release_raw_data(self) -> Optional[int]:
+        """
+        Extracts all symbol lists and then drops the raw MUSCIMA++ data
+        (documents and crop objects), keeping only what rendering needs.
+        Returns the number of resident bytes freed (None if unknown).
+        """
+        self.load_all_symbols()
+
+        memory_before = _get_resident_memory()
+        for name in SymbolRepository.RAW_DATA + ["_crop_object_positions"]:
+            self.__dict__.pop(name, None)
+        gc.collect()
+        memory_after = _get_resident_memory()
+
+        if memory_before is None or memory_after is None:
+            print("Released raw MUSCIMA++ data.")
+            return None
+        freed = memory_before - memory_after
+        print("Released raw MUSCIMA++ data, freed %.1f MB of resident memory."
+              % (freed / 1024 / 1024))
+        return freed
+
+    def subset(
+            self,
+            documents: Optional[List[str]] = None,
+            take_writers: Optional[List[int]] = None,
+            skip_writers: Optional[List[int]] = None
+    ):
+        """
+        Creates a repository restricted to the given documents or writers.
+        Its symbols are taken from this repository (sharing mask arrays),
+        so nothing gets reloaded or extracted again.
+        """
+        repo = SymbolRepository.__new__(SymbolRepository)
+        repo.CONFIG = self.CONFIG
+        repo._document_index = _filter_documents(
+            self._document_index, documents, take_writers, skip_writers
+        )
+        repo.DOCUMENT_NAMES = [d["document"] for d in repo._document_index]
+        repo._use_compiled_cache = False
+        repo._compiled_path = None
+        repo._parent = self
+        repo._stamp_notes = self._stamp_notes
+        return repo
+
+    def _init_sprite_keys(self):
+        """Creates the lookups of sprite keys (see get_sprite_key)"""
+        self._sprites_by_key: Dict[Tuple[str, int, Optional[str]], Sprite] = {}
+        self._sprite_keys: Dict[int, Tuple[str, int, Optional[str]]] = {}
+        self._keys_by_list: Dict[str, List[Tuple[str, int, Optional[str]]]] = {}
+        self._list_fingerprints: Dict[str, int] = {}
+
+    def _load_symbols(self, extractor: str):
+        """Restores or extracts the symbol lists of the given extractor"""
+        if self._parent is not None:
+            self._set_symbols(self._derive_symbols(extractor))
+            return
+
+        path = os.path.join(self._compiled_path, extractor + ".pkl")
+
+        symbols = None
+        if self._use_compiled_cache:
+            symbols = load_compiled_repository(path)
+
+        if symbols is None:
+            symbols = self._extract_symbols(extractor)
+            if self._use_compiled_cache:
+                save_compiled_repository(path, symbols)
+
+                # switch over to the memory-mapped masks, so that even
+                # the process that compiled the repository shares them
+                symbols = load_compiled_repository(path) or symbols
+
+        self._set_symbols(symbols)
+
+    def _set_symbols(self, symbols: Dict):
+        """Sets loaded symbol lists as attributes, with their flipped variants"""
+        for name, symbol_list in symbols.items():
+            _validate_symbols(name, symbol_list)
+            if name not in SymbolRepository.FLIPPED_LISTS:
+                setattr(self, name, symbol_list)
+                self._index_symbols(name, symbol_list)
+                continue
+
+            from mashcima.get_symbols import create_flipped_note
+            flipped_list = [create_flipped_note(item) for item in symbol_list]
+            if self._stamp_notes:
+                symbol_list = [item.copy().create_stamp() for item in symbol_list]
+                flipped_list = [item.create_stamp() for item in flipped_list]
+            setattr(self, name, symbol_list)
+            setattr(self, SymbolRepository.FLIPPED_LISTS[name], flipped_list)
+            self._index_symbols(name, symbol_list)
+            self._index_symbols(SymbolRepository.FLIPPED_LISTS[name], flipped_list)
+
+    def _load_documents(self):
+        """Loads the selected MUSCIMA++ documents"""
+        self.DOCUMENTS = _restore_documents_from_cache(
+            self.CONFIG, self._document_index
+        )
 
         # all loaded crop objects in one list
         self.CROP_OBJECTS = list(itertools.chain(*self.DOCUMENTS))
 
         # for each document name create an objid lookup dictionary
         # (to make resolving outlinks easier)
-        self.CROP_OBJECT_LOOKUP_DICTS: Dict[str, Dict[int, CropObject]] = {
-            self.DOCUMENT_NAMES[i]: {c.objid: c for c in doc}
-            for i, doc in enumerate(self.DOCUMENTS)
+        self.CROP_OBJECT_LOOKUP_DICTS: Dict[str, Dict[int, "CropObject"]] = {
+            doc[0].doc: {c.objid: c for c in doc}
+            for doc in self.DOCUMENTS
         }
 
-        ####################################
-        # Prepare all symbols for printing #
-        ####################################
+        # crop objects grouped by class name (in the CROP_OBJECTS order)
+        self.CROP_OBJECTS_BY_CLSNAME: Dict[str, List["CropObject"]] = {}
+        for c in self.CROP_OBJECTS:
+            self.CROP_OBJECTS_BY_CLSNAME.setdefault(c.clsname, []).append(c)
+
+        # outlinked objects, indexed by (document, objid, target clsname)
+        # (in the order of outlinks)
+        self.CROP_OBJECT_OUTLINKS: Dict[Tuple[str, int, str], List["CropObject"]] = {}
+        for c in self.CROP_OBJECTS:
+            lookup = self.CROP_OBJECT_LOOKUP_DICTS[c.doc]
+            for l in c.outlinks:
+                target = lookup[l]
+                self.CROP_OBJECT_OUTLINKS.setdefault(
+                    (c.doc, c.objid, target.clsname), []
+                ).append(target)
+
+        self._crop_object_positions = {
+            id(c): i for i, c in enumerate(self.CROP_OBJECTS)
+        }
+
+    def get_crop_objects(self, *clsnames: str) -> List["CropObject"]:
+        """Returns crop objects of given class names (in the CROP_OBJECTS order)"""
+        if len(clsnames) == 1:
+            return self.CROP_OBJECTS_BY_CLSNAME.get(clsnames[0], [])
+        return sorted(
+            itertools.chain(*[
+                self.CROP_OBJECTS_BY_CLSNAME.get(clsname, [])
+                for clsname in clsnames
+            ]),
+            key=lambda c: self._crop_object_positions[id(c)]
+        )
+
+    def get_outlinks(self, obj: "CropObject", clsname: str) -> List["CropObject"]:
+        """Returns objects of given class name the object has outlinks to"""
+        return self.CROP_OBJECT_OUTLINKS.get((obj.doc, obj.objid, clsname), [])
 
-        print("Preparing symbols...")
+    def _extract_symbols(self, extractor: str) -> Dict:
+        """
+        Extracts symbol lists using the given function from get_symbols.py
+        and fills empty lists with default symbols
+        """
+        print("Preparing symbols: " + extractor)
 
         # prevents cyclic imports
-        from mashcima.get_symbols import get_whole_notes
-        from mashcima.get_symbols import get_half_notes
-        from mashcima.get_symbols import get_quarter_notes
-        from mashcima.get_symbols import get_eighth_notes
-        from mashcima.get_symbols import get_sixteenth_notes
-        from mashcima.get_symbols import get_longa_rests
-        from mashcima.get_symbols import get_breve_rests
-        from mashcima.get_symbols import get_whole_rests
-        from mashcima.get_symbols import get_half_rests
-        from mashcima.get_symbols import get_quarter_rests
-        from mashcima.get_symbols import get_eighth_rests
-        from mashcima.get_symbols import get_sixteenth_rests
-        from mashcima.get_symbols import get_accidentals
-        from mashcima.get_symbols import get_dots
-        from mashcima.get_symbols import get_ledger_lines
-        from mashcima.get_symbols import get_barlines
-        from mashcima.get_symbols import get_g_clefs
-        from mashcima.get_symbols import get_f_clefs
-        from mashcima.get_symbols import get_c_clefs
-        from mashcima.get_symbols import get_time_marks
-
-        # load all symbols
-        self.WHOLE_NOTES: List[SpriteGroup] = get_whole_notes(self)
-        self.HALF_NOTES: List[SpriteGroup] = get_half_notes(self)
-        self.QUARTER_NOTES: List[SpriteGroup] = get_quarter_notes(self)
-        self.EIGHTH_NOTES: List[SpriteGroup] = get_eighth_notes(self)
-        self.SIXTEENTH_NOTES: List[SpriteGroup] = get_sixteenth_notes(self)
-
-        self.LONGA_RESTS: List[SpriteGroup] = get_longa_rests(self)
-        self.BREVE_RESTS: List[SpriteGroup] = get_breve_rests(self)
-        self.WHOLE_RESTS: List[SpriteGroup] = get_whole_rests(self)
-        self.HALF_RESTS: List[SpriteGroup] = get_half_rests(self)
-        self.QUARTER_RESTS: List[SpriteGroup] = get_quarter_rests(self)
-        self.EIGHTH_RESTS: List[SpriteGroup] = get_eighth_rests(self)
-        self.SIXTEENTH_RESTS: List[SpriteGroup] = get_sixteenth_rests(self)
-
-        self.SHARPS: List[Sprite] = []
-        self.FLATS: List[Sprite] = []
-        self.NATURALS: List[Sprite] = []
-        self.SHARPS, self.FLATS, self.NATURALS = get_accidentals(self)
-        self.DOTS: List[Sprite] = get_dots(self)
-        self.LEDGER_LINES: List[Sprite] = get_ledger_lines(self)
-        self.BAR_LINES: List[SpriteGroup] = []
-        self.TALL_BAR_LINES: List[SpriteGroup] = []
-        self.BAR_LINES, self.TALL_BAR_LINES = get_barlines(self)
-        self.G_CLEFS: List[SpriteGroup] = get_g_clefs(self)
-        self.F_CLEFS: List[SpriteGroup] = get_f_clefs(self)
-        self.C_CLEFS: List[SpriteGroup] = get_c_clefs(self)
-        self.TIME_MARKS: Dict[str, List[SpriteGroup]] = get_time_marks(self)
+        import mashcima.get_symbols
+
+        extracted = getattr(mashcima.get_symbols, extractor)(self)
+        names = SymbolRepository.SYMBOL_EXTRACTORS[extractor]
+        if len(names) == 1:
+            extracted = (extracted,)
+        symbols = dict(zip(names, extracted))
+
+        # tag symbols with the writer of their document
+        for symbol_list in symbols.values():
+            for item in _iterate_symbols(symbol_list):
+                item.source_writer = _get_writer(item.source_document)
 
         # load default symbols if needed
-        if len(self.EIGHTH_NOTES) == 0:
-            self.EIGHTH_NOTES.append(_load_default_eighth_note())
-        if len(self.SIXTEENTH_NOTES) == 0:
-            self.SIXTEENTH_NOTES.append(_load_default_sixteenth_note())
-        if len(self.LONGA_RESTS) == 0:
-            self.LONGA_RESTS.append(_load_default_sprite_group("rest", "rest_longa"))
-        if len(self.BREVE_RESTS) == 0:
-            self.BREVE_RESTS.append(_load_default_sprite_group("rest", "rest_breve"))
-        if len(self.WHOLE_RESTS) == 0:
-            self.WHOLE_RESTS.append(_load_default_sprite_group("rest", "rest_whole"))
-        if len(self.HALF_RESTS) == 0:
-            self.HALF_RESTS.append(_load_default_sprite_group("rest", "rest_half"))
-        if len(self.QUARTER_RESTS) == 0:
-            self.QUARTER_RESTS.append(_load_default_sprite_group("rest", "rest_quarter"))
-        if len(self.EIGHTH_RESTS) == 0:
-            self.EIGHTH_RESTS.append(_load_default_sprite_group("rest", "rest_eighth"))
-        if len(self.SIXTEENTH_RESTS) == 0:
-            self.SIXTEENTH_RESTS.append(_load_default_sprite_group("rest", "rest_sixteenth"))
-        if len(self.F_CLEFS) == 0:
-            self.F_CLEFS.append(_load_default_sprite_group("clef", "clef_f"))
-        if len(self.G_CLEFS) == 0:
-            self.G_CLEFS.append(_load_default_sprite_group("clef", "clef_g"))
-        if len(self.C_CLEFS) == 0:
-            self.C_CLEFS.append(_load_default_sprite_group("clef", "clef_c"))
-        for key in self.TIME_MARKS:
-            if len(self.TIME_MARKS[key]) == 0:
-                self.TIME_MARKS[key].append(
+        for name, symbol_list in symbols.items():
+            _add_default_symbols(name, symbol_list)
+
+        _trim_symbols(symbols)
+
+        return symbols
+
+    def _derive_symbols(self, extractor: str) -> Dict:
+        """Takes symbol lists from the parent repository, that come from
+        documents of this repository"""
+        document_names = set(self.DOCUMENT_NAMES)
+
+        def _filter(symbol_list):
+            return [
+                item for item in symbol_list
+                if item.source_document in document_names
+            ]
+
+        symbols = {}
+        for name in SymbolRepository.SYMBOL_EXTRACTORS[extractor]:
+            parent_list = getattr(self._parent, name)
+            if name == "TIME_MARKS":
+                symbols[name] = {
+                    key: _filter(parent_list[key]) for key in parent_list
+                }
+            else:
+                symbols[name] = _filter(parent_list)
+            _add_default_symbols(name, symbols[name])
+        _trim_symbols(symbols)
+        return symbols
+
+
+def _iterate_symbols(symbols):
+    """Iterates over items of a symbol list (or of the TIME_MARKS dict)"""
+    if isinstance(symbols, dict):
+        for symbol_list in symbols.values():
+            yield from symbol_list
+    else:
+        yield from symbols
+
+
+def _trim_symbols(symbols: Dict):
+    """Trims empty borders off masks of all sprites in the symbol lists"""
+    for symbol_list in symbols.values():
+        for item in _iterate_symbols(symbol_list):
+            sprites = [item] if isinstance(item, Sprite) else item.sprites.values()
+            for sprite in sprites:
+                sprite.trim()
+
+
+def _add_default_symbols(name: str, symbols):
+    """Adds a default symbol into a list that came out empty"""
+    if name == "TIME_MARKS":
+        for key in symbols:
+            if len(symbols[key]) == 0:
+                symbols[key].append(
                     _load_default_sprite_group("symbol", key)
                 )
-
-        # validate there is no empty list
-        assert len(self.WHOLE_NOTES) > 0
-        assert len(self.HALF_NOTES) > 0
-        assert len(self.QUARTER_NOTES) > 0
-        assert len(self.EIGHTH_NOTES) > 0
-        assert len(self.SIXTEENTH_NOTES) > 0
-        assert len(self.LONGA_RESTS) > 0
-        assert len(self.BREVE_RESTS) > 0
-        assert len(self.WHOLE_RESTS) > 0
-        assert len(self.HALF_RESTS) > 0
-        assert len(self.QUARTER_RESTS) > 0
-        assert len(self.EIGHTH_RESTS) > 0
-        assert len(self.SIXTEENTH_RESTS) > 0
-        assert len(self.FLATS) > 0
-        assert len(self.SHARPS) > 0
-        assert len(self.NATURALS) > 0
-        assert len(self.DOTS) > 0
-        assert len(self.LEDGER_LINES) > 0
-        assert len(self.BAR_LINES) > 0
-        assert len(self.TALL_BAR_LINES) > 0
-        assert len(self.G_CLEFS) > 0
-        assert len(self.F_CLEFS) > 0
-        assert len(self.C_CLEFS) > 0
-        for key in self.TIME_MARKS:
-            assert len(self.TIME_MARKS[key]) > 0
-
-        print("Symbols loaded.")
+        return
+
+    if len(symbols) > 0:
+        return
+
+    if name == "EIGHTH_NOTES":
+        symbols.append(_load_default_eighth_note())
+    if name == "SIXTEENTH_NOTES":
+        symbols.append(_load_default_sixteenth_note())
+    if name == "LONGA_RESTS":
+        symbols.append(_load_default_sprite_group("rest", "rest_longa"))
+    if name == "BREVE_RESTS":
+        symbols.append(_load_default_sprite_group("rest", "rest_breve"))
+    if name == "WHOLE_RESTS":
+        symbols.append(_load_default_sprite_group("rest", "rest_whole"))
+    if name == "HALF_RESTS":
+        symbols.append(_load_default_sprite_group("rest", "rest_half"))
+    if name == "QUARTER_RESTS":
+        symbols.append(_load_default_sprite_group("rest", "rest_quarter"))
+    if name == "EIGHTH_RESTS":
+        symbols.append(_load_default_sprite_group("rest", "rest_eighth"))
+    if name == "SIXTEENTH_RESTS":
+        symbols.append(_load_default_sprite_group("rest", "rest_sixteenth"))
+    if name == "F_CLEFS":
+        symbols.append(_load_default_sprite_group("clef", "clef_f"))
+    if name == "G_CLEFS":
+        symbols.append(_load_default_sprite_group("clef", "clef_g"))
+    if name == "C_CLEFS":
+        symbols.append(_load_default_sprite_group("clef", "clef_c"))
+
+
+def _validate_symbols(name: str, symbols):
+    """Validates there is no empty list"""
+    if name == "TIME_MARKS":
+        for key in symbols:
+            assert len(symbols[key]) > 0, "No symbols for " + name + ": " + key
+    else:
+        assert len(symbols) > 0, "No symbols for " + name
 
 
 def _load_default_sprite_group(sprite_name: str, file_name: str) -> SpriteGroup:
@@ -233,7 +673,7 @@ def _load_default_sprite(name: str) -> Sprite:
     center_path = os.path.join(dir, name + ".txt")
     if not os.path.isfile(img_path):
         raise Exception("Cannot load default sprite: " + name)
-    img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE) / 255
+    img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE) > 127
     x = -img.shape[1] // 2
     y = -img.shape[0] // 2
     if os.path.isfile(center_path):
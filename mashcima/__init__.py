@@ -1,16 +1,65 @@
-from mashcima.CanvasOptions import CanvasOptions
-from mashcima.Canvas import Canvas
-from mashcima.SymbolRepository import SymbolRepository
-from mashcima.annotation_to_image import multi_staff_annotation_to_image
-from typing import Optional
-from mashcima.generate_random_annotation import generate_random_annotation
-from mashcima.primus_adapter import load_primus_as_mashcima_annotations, convert_primus_annotation_to_mashcima_annotation
+import sys
+import types
+import importlib
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from mashcima.CanvasOptions import CanvasOptions
+    from mashcima.SymbolRepository import SymbolRepository
+    from mashcima.Scene import Scene
+
+
+# Public names of the package and modules they live in. They are imported
+# on first access, so that importing the package (e.g. just to use
+# the vocabulary) does not pull in opencv, muscima and the like.
+_LAZY_ATTRIBUTES = {
+    "CanvasOptions": "mashcima.CanvasOptions",
+    "Canvas": "mashcima.Canvas",
+    "SymbolRepository": "mashcima.SymbolRepository",
+    "Scene": "mashcima.Scene",
+    "multi_staff_annotation_to_image": "mashcima.annotation_to_image",
+    "multi_staff_annotation_to_scene": "mashcima.annotation_to_image",
+    "scene_to_bytes": "mashcima.scene_file",
+    "scene_from_bytes": "mashcima.scene_file",
+    "save_scene": "mashcima.scene_file",
+    "load_scene": "mashcima.scene_file",
+    "generate_random_annotation": "mashcima.generate_random_annotation",
+    "load_primus_as_mashcima_annotations": "mashcima.primus_adapter",
+    "convert_primus_annotation_to_mashcima_annotation": "mashcima.primus_adapter",
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(
+            "module 'mashcima' has no attribute '" + name + "'"
+        )
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+class _MashcimaModule(types.ModuleType):
+    def __setattr__(self, name, value):
+        # importing a submodule binds it onto the package, which would
+        # hide the class or function of the same name (e.g. mashcima.Canvas)
+        if isinstance(value, types.ModuleType) and name in _LAZY_ATTRIBUTES:
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _MashcimaModule
 
 
 def use_only_writer_number_one():
     """
     Setup the default symbol repository to use only symbols of the writer 1
     """
+    from mashcima.SymbolRepository import SymbolRepository
     SymbolRepository.DEFAULT_REPOSITORY = SymbolRepository([
         "CVC-MUSCIMA_W-01_N-10_D-ideal.xml",
         "CVC-MUSCIMA_W-01_N-14_D-ideal.xml",
@@ -22,6 +71,7 @@ def use_default_setup():
     """
     Setup the default repository back to its default settings
     """
+    from mashcima.SymbolRepository import SymbolRepository
     SymbolRepository.DEFAULT_REPOSITORY = None
 
 
@@ -30,9 +80,9 @@ def synthesize(
     above_annotation: Optional[str] = None,
     below_annotation: Optional[str] = None,
     
-    main_canvas_options: Optional[CanvasOptions] = None,
-    above_canvas_options: Optional[CanvasOptions] = None,
-    below_canvas_options: Optional[CanvasOptions] = None,
+    main_canvas_options: Optional["CanvasOptions"] = None,
+    above_canvas_options: Optional["CanvasOptions"] = None,
+    below_canvas_options: Optional["CanvasOptions"] = None,
     
     min_width: int = 0,
     
@@ -40,7 +90,12 @@ def synthesize(
     crop_vertically: bool = True,
     transform_image: bool = True,
 
-    symbol_repository: Optional[SymbolRepository] = None
+    symbol_repository: Optional["SymbolRepository"] = None,
+
+    output_dtype=None,
+    overflow: str = "truncate",
+    output_height: Optional[int] = None,
+    output_scale: Optional[float] = None
 ):
     """
     Synthesizes an image, using the mashcima synthesizer
@@ -66,13 +121,82 @@ def synthesize(
         to the final image, further increasing data variability.
     :param symbol_repository SymbolRepository|None: You can provide a custom
         symbol repository to be used during the synthesis.
+    :param output_dtype numpy.dtype|None: Type of the produced image, the whole
+        rendering happens in this type. None means float32 with values from
+        0.0 to 1.0, numpy.uint8 produces values from 0 to 255.
+    :param overflow str: What happens when the main staff content is wider
+        than the staff lines image. "truncate" cuts the content off, "extend"
+        makes the image wider (staff lines get extended) and "raise" raises
+        an exception.
+    :param output_height int|None: Height in pixels the final image is
+        resized to (keeping the aspect ratio).
+    :param output_scale float|None: Scale the final image is resized by
+        (use either this or the output height). Resizing is a part
+        of the final affine transformation, so no full resolution
+        image gets transformed and then resized.
     """
 
+    scene = synthesize_scene(
+        main_annotation,
+        above_annotation=above_annotation,
+        below_annotation=below_annotation,
+        main_canvas_options=main_canvas_options,
+        above_canvas_options=above_canvas_options,
+        below_canvas_options=below_canvas_options,
+        min_width=min_width,
+        crop_horizontally=crop_horizontally,
+        crop_vertically=crop_vertically,
+        transform_image=transform_image,
+        symbol_repository=symbol_repository,
+        overflow=overflow,
+        output_height=output_height,
+        output_scale=output_scale
+    )
+
+    return render_scene(
+        scene,
+        symbol_repository=symbol_repository,
+        output_dtype=output_dtype
+    )
+
+
+def synthesize_scene(
+    main_annotation: str,
+    above_annotation: Optional[str] = None,
+    below_annotation: Optional[str] = None,
+
+    main_canvas_options: Optional["CanvasOptions"] = None,
+    above_canvas_options: Optional["CanvasOptions"] = None,
+    below_canvas_options: Optional["CanvasOptions"] = None,
+
+    min_width: int = 0,
+
+    crop_horizontally: bool = True,
+    crop_vertically: bool = True,
+    transform_image: bool = True,
+
+    symbol_repository: Optional["SymbolRepository"] = None,
+
+    overflow: str = "truncate",
+    output_height: Optional[int] = None,
+    output_scale: Optional[float] = None
+) -> "Scene":
+    """
+    Performs only the layout part of the synthesize method, all the random
+    decisions are made here. The returned scene holds sprite keys, positions,
+    lines and the transformation and can be rendered later by render_scene,
+    with the same symbol repository. Parameters are the same
+    as for the synthesize method.
+    """
+
+    from mashcima.SymbolRepository import SymbolRepository
+    from mashcima.annotation_to_image import multi_staff_annotation_to_scene
+
     # if no repository was provided, use the default one
     if symbol_repository is None:
         symbol_repository = SymbolRepository.load_default()
 
-    return multi_staff_annotation_to_image(
+    return multi_staff_annotation_to_scene(
         symbol_repository,
         main_annotation=main_annotation,
         above_annotation=above_annotation,
@@ -83,20 +207,53 @@ def synthesize(
         min_width=min_width,
         crop_horizontally=crop_horizontally,
         crop_vertically=crop_vertically,
-        transform_image=transform_image
+        transform_image=transform_image,
+        overflow=overflow,
+        output_height=output_height,
+        output_scale=output_scale
     )
 
 
+def render_scene(
+    scene: "Scene",
+    symbol_repository: Optional["SymbolRepository"] = None,
+    output_dtype=None
+):
+    """
+    Renders a scene produced by synthesize_scene into the final image
+
+    :param scene Scene: The scene to render.
+    :param symbol_repository SymbolRepository|None: The repository the scene
+        was synthesized with (the default one if None).
+    :param output_dtype numpy.dtype|None: Type of the produced image,
+        see the synthesize method.
+    """
+
+    from mashcima.SymbolRepository import SymbolRepository
+
+    # if no repository was provided, use the default one
+    if symbol_repository is None:
+        symbol_repository = SymbolRepository.load_default()
+
+    return scene.render(symbol_repository, output_dtype)
+
+
 def synthesize_for_beauty(
     main_annotation: str,
     above_annotation: Optional[str] = None,
     below_annotation: Optional[str] = None,
-    symbol_repository: Optional[SymbolRepository] = None
+    symbol_repository: Optional["SymbolRepository"] = None,
+    output_dtype=None,
+    overflow: str = "truncate",
+    output_height: Optional[int] = None,
+    output_scale: Optional[float] = None
 ):
     """
     Calls the synthesize method with such parameters, that the resulting image
     is good looking, but may not be optimal for training
     """
+    from mashcima.CanvasOptions import CanvasOptions
+
     canvas_options = CanvasOptions.get_empty()
     canvas_options.random_space_probability = 0.0
     canvas_options.randomize_stem_flips_for_pitches = []
@@ -112,7 +269,11 @@ def synthesize_for_beauty(
         below_canvas_options=canvas_options,
 
         transform_image=False, # do not transform
-        symbol_repository=symbol_repository
+        symbol_repository=symbol_repository,
+        output_dtype=output_dtype,
+        overflow=overflow,
+        output_height=output_height,
+        output_scale=output_scale
     )
 
 
@@ -120,7 +281,11 @@ def synthesize_for_training(
     main_annotation: str,
     above_annotation: Optional[str] = None,
     below_annotation: Optional[str] = None,
-    symbol_repository: Optional[SymbolRepository] = None
+    symbol_repository: Optional["SymbolRepository"] = None,
+    output_dtype=None,
+    overflow: str = "truncate",
+    output_height: Optional[int] = None,
+    output_scale: Optional[float] = None
 ):
     """
     Calls the synthesize method with such parameters, that the resulting image
@@ -132,5 +297,9 @@ def synthesize_for_training(
         below_annotation=below_annotation,
         min_width=1200, # px
         transform_image=True, # yes, add affine transforms
-        symbol_repository=symbol_repository
+        symbol_repository=symbol_repository,
+        output_dtype=output_dtype,
+        overflow=overflow,
+        output_height=output_height,
+        output_scale=output_scale
     )
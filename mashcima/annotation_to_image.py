@@ -7,6 +7,7 @@ from mashcima.vocabulary import parse_annotation_into_token_groups
 from mashcima.vocabulary import KeySignatureTokenGroup, TimeSignatureTokenGroup, TokenGroup
 from mashcima.SymbolRepository import SymbolRepository
 from mashcima.Canvas import Canvas
+from mashcima.Scene import Scene
 from mashcima.canvas_items.Barline import Barline
 from mashcima.canvas_items.Clef import Clef
 from mashcima.canvas_items.Rest import Rest
@@ -142,85 +143,160 @@ def multi_staff_annotation_to_image(
         min_width=0,  # keep some empty staff lines after the end
         crop_horizontally=True,
         crop_vertically=True,
-        transform_image=True
+        transform_image=True,
+        output_dtype=None,
+        overflow="truncate",
+        output_height: Optional[int] = None,
+        output_scale: Optional[float] = None
 ) -> np.ndarray:
     """
     Advanced function that creates image of a staff with staves above and
     below and applies transformations if requested.
+    The whole image is rendered in the output dtype (float32 by default),
+    ink has the value 1.0 for floats and 255 for uint8.
+    Overflow says what happens when the main staff content is wider than
+    the staff lines image: "truncate" it, "extend" the image (staff lines
+    get repeated) or "raise" an exception.
+    The output height or scale resizes the final image, the scaling
+    is part of the single final transformation.
+    """
+    scene = multi_staff_annotation_to_scene(
+        repo,
+        main_annotation,
+        above_annotation,
+        below_annotation,
+        main_canvas_options=main_canvas_options,
+        above_canvas_options=above_canvas_options,
+        below_canvas_options=below_canvas_options,
+        min_width=min_width,
+        crop_horizontally=crop_horizontally,
+        crop_vertically=crop_vertically,
+        transform_image=transform_image,
+        overflow=overflow,
+        output_height=output_height,
+        output_scale=output_scale
+    )
+    return scene.render(repo, output_dtype)
+
+
+def multi_staff_annotation_to_scene(
+        repo: SymbolRepository,
+        main_annotation: str,
+        above_annotation: Optional[str],
+        below_annotation: Optional[str],
+        main_canvas_options: Optional[CanvasOptions] = None,
+        above_canvas_options: Optional[CanvasOptions] = None,
+        below_canvas_options: Optional[CanvasOptions] = None,
+        min_width=0,  # keep some empty staff lines after the end
+        crop_horizontally=True,
+        crop_vertically=True,
+        transform_image=True,
+        overflow="truncate",
+        output_height: Optional[int] = None,
+        output_scale: Optional[float] = None
+) -> Scene:
+    """
+    Layout pass of multi_staff_annotation_to_image, all the randomness
+    happens here and the returned scene is then rendered deterministically
     """
     from mashcima.generate_staff_lines import generate_staff_lines
-    from mashcima.transform_image import transform_image as transform_image_function
+    from mashcima.transform_image import generate_transformation
+    from mashcima.transform_image import get_crop_transformation
+    from mashcima.transform_image import scale_transformation
+
+    assert overflow in ["truncate", "extend", "raise"]
+    assert output_height is None or output_scale is None
 
     staff_img, pitch_positions = generate_staff_lines(repo.CONFIG)
     staff_height = staff_img.shape[0] // 3
     staff_width = staff_img.shape[1]
 
-    img = np.zeros(
-        shape=(staff_height * 9, staff_width),
-        dtype=np.float32
-    )
-
-    # draw staff lines
-    if above_annotation is not None:
-        img[staff_height * 1:staff_height * 4, :] = staff_img
-    img[staff_height * 3:staff_height * 6, :] = staff_img
-    if below_annotation is not None:
-        img[staff_height * 5:staff_height * 8, :] = staff_img
+    # canvases with staff indices (in staff heights from the top)
+    canvases = []
 
-    # draw above staff symbols
+    # place above staff symbols
     if above_annotation is not None:
         canvas = Canvas()
         canvas.options.barlines_up = False
         canvas.options.barlines_down = False
         canvas.options.override_values_from(above_canvas_options)
         annotation_to_canvas(canvas, above_annotation)
-        canvas.render_onto_image(
-            repo, img,
+        canvas.place(
+            repo,
             {pitch: y + staff_height * 1 for pitch, y in pitch_positions.items()},
             head_start=0
         )
+        canvases.append((canvas, 1))
 
-    # draw main staff symbols
+    # place main staff symbols
     canvas = Canvas()
     canvas.options.barlines_up = above_annotation is not None
     canvas.options.barlines_down = below_annotation is not None
     canvas.options.override_values_from(main_canvas_options)
     annotation_to_canvas(canvas, main_annotation)
-    head_end = canvas.render_onto_image(
-        repo, img,
+    head_end = canvas.place(
+        repo,
         {pitch: y + staff_height * 3 for pitch, y in pitch_positions.items()},
         head_start=0
     )
+    canvases.append((canvas, 3))
 
-    # draw below staff symbols
+    # place below staff symbols
     if below_annotation is not None:
         canvas = Canvas()
         canvas.options.barlines_up = False
         canvas.options.barlines_down = False
         canvas.options.override_values_from(below_canvas_options)
         annotation_to_canvas(canvas, below_annotation)
-        canvas.render_onto_image(
-            repo, img,
+        canvas.place(
+            repo,
             {pitch: y + staff_height * 5 for pitch, y in pitch_positions.items()},
             head_start=0
         )
+        canvases.append((canvas, 5))
+
+    if head_end > staff_width and overflow == "raise":
+        raise Exception(
+            "Staff content is %d px wide, but the staff has only %d px"
+            % (head_end, staff_width)
+        )
 
     # minimal length
     if head_end < min_width:
         head_end = min_width
 
+    # the whole image with all the staves
+    # (only a region of it is actually rendered)
+    img_width = staff_width
+    if overflow == "extend":
+        img_width = max(staff_width, head_end)
+    if overflow == "truncate":
+        head_end = min(head_end, img_width)
+    scene = Scene(img_width, staff_height * 9)
+
+    for canvas, staff_index in canvases:
+        scene.staves.append(staff_height * staff_index)
+        canvas.add_to_scene(scene, repo)
+
     # cropping box
-    box = [
+    scene.box = [
         0,  # x
         staff_height * 3 if crop_vertically else 0,  # y
-        head_end if crop_horizontally else staff_width,  # width
-        staff_height * 3 if crop_vertically else img.shape[0]  # height
+        head_end if crop_horizontally else scene.width,  # width
+        staff_height * 3 if crop_vertically else scene.height  # height
     ]
 
-    # transform or just crop
+    # the transformation is known before rendering,
+    # so only the pixels it reads from get drawn
     if transform_image:
-        img = transform_image_function(img, box)
-    else:
-        img = img[box[1]:box[1]+box[3], box[0]:box[0]+box[2]]
+        scene.matrix, scene.dest_size = generate_transformation(scene.box)
+
+    # scaling is folded into the transformation
+    if output_height is not None or output_scale is not None:
+        if scene.matrix is None:
+            scene.matrix, scene.dest_size = get_crop_transformation(scene.box)
+        scene.matrix, scene.dest_size = scale_transformation(
+            scene.matrix, scene.dest_size, output_scale, output_height
+        )
 
-    return img
+    return scene
@@ -2,7 +2,6 @@ from mashcima.SymbolRepository import SymbolRepository
 from mashcima.canvas_items.SlurableItem import SlurableItem
 from mashcima.Sprite import Sprite
 import random
-import copy
 from typing import Dict
 
 
@@ -20,9 +19,9 @@ class Barline(SlurableItem):
 
     def select_sprites(self, repo: SymbolRepository):
         if not self.up and not self.down:
-            self.sprites = copy.deepcopy(random.choice(repo.BAR_LINES))
+            self.sprites = random.choice(repo.BAR_LINES).copy()
         else:
-            self.sprites = copy.deepcopy(random.choice(repo.TALL_BAR_LINES))
+            self.sprites = random.choice(repo.TALL_BAR_LINES).copy()
         super().select_sprites(repo)
 
     def place_sprites(self):
@@ -1,6 +1,5 @@
 from mashcima.SymbolRepository import SymbolRepository
 from mashcima.canvas_items.QuarterNote import QuarterNote
-import copy
 
 
 class BeamedNote(QuarterNote):
@@ -45,10 +44,13 @@ class BeamedNote(QuarterNote):
         self.flipped = self.beam.flipped
 
     def update_sprites_for_stem_length(self, stem_length: int):
-        self.sprites = copy.deepcopy(self.sprites)
-
+        # sprites are already a copy of the repository symbol
+        # and the stretched stem mask comes from a shared cache
         sign = -1 if self.flipped else 1
 
+        # the stem changes, so it cannot be drawn as part of a stamp
+        self.sprites.remove_stamp()
+
         stem = self.sprites.sprite("stem")
         lengthen = stem_length + stem.y
         if self.flipped:
@@ -51,24 +51,33 @@ class CanvasItem:
         self.sprites.position_y = pitch_positions[0]
         return self.sprites.width
 
-    def render(self, img: np.ndarray):
-        self.sprites.render(img)
-
-        if self.DEBUG_RENDER:
-            # origin
-            draw_cross(img, self.sprites.position_x, self.sprites.position_y, 10)
-
-            # bounding box
-            cv2.rectangle(
-                img,
-                (
-                    self.sprites.left + self.sprites.position_x,
-                    self.sprites.top + self.sprites.position_y
-                ),
-                (
-                    self.sprites.right + self.sprites.position_x,
-                    self.sprites.bottom + self.sprites.position_y
-                ),
-                color=0.5,
-                thickness=1
-            )
+    def prepare_render(self):
+        """
+        Called after all items have been placed, decides all the remaining
+        random details, so that rendering itself is deterministic
+        """
+        pass
+
+    def add_to_scene(self, scene, repo: SymbolRepository):
+        """Adds everything the item draws into a scene"""
+        scene.add_sprite_group(repo, self.sprites)
+
+    def render_debug(self, img: np.ndarray):
+        """Draws the origin and the bounding box of the item"""
+        # origin
+        draw_cross(img, self.sprites.position_x, self.sprites.position_y, 10)
+
+        # bounding box
+        cv2.rectangle(
+            img,
+            (
+                self.sprites.left + self.sprites.position_x,
+                self.sprites.top + self.sprites.position_y
+            ),
+            (
+                self.sprites.right + self.sprites.position_x,
+                self.sprites.bottom + self.sprites.position_y
+            ),
+            color=0.5,
+            thickness=1
+        )
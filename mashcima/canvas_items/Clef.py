@@ -1,6 +1,5 @@
 from mashcima.SymbolRepository import SymbolRepository
 from mashcima.canvas_items.CanvasItem import CanvasItem
-import copy
 import random
 from typing import Dict
 
@@ -27,11 +26,11 @@ class Clef(CanvasItem):
 
     def select_sprites(self, repo: SymbolRepository):
         if self.clef == "G":
-            self.sprites = copy.deepcopy(random.choice(repo.G_CLEFS))
+            self.sprites = random.choice(repo.G_CLEFS).copy()
         if self.clef == "F":
-            self.sprites = copy.deepcopy(random.choice(repo.F_CLEFS))
+            self.sprites = random.choice(repo.F_CLEFS).copy()
         if self.clef == "C":
-            self.sprites = copy.deepcopy(random.choice(repo.C_CLEFS))
+            self.sprites = random.choice(repo.C_CLEFS).copy()
         super().select_sprites(repo)
 
     def place_item(self, head: int, pitch_positions: Dict[int, int]) -> int:
@@ -1,8 +1,5 @@
 from mashcima.SymbolRepository import SymbolRepository
 from mashcima.canvas_items.StemNote import StemNote
-import random
-import copy
-import numpy as np
 
 
 class FlagNote(StemNote):
@@ -17,20 +14,11 @@ class FlagNote(StemNote):
 
     def select_sprites(self, repo: SymbolRepository):
         if self.kind == "e":
-            self.sprites = copy.deepcopy(random.choice(repo.EIGHTH_NOTES))
+            self._select_note_sprites(
+                repo.EIGHTH_NOTES, repo.EIGHTH_NOTES_FLIPPED
+            )
         if self.kind == "s":
-            self.sprites = copy.deepcopy(random.choice(repo.SIXTEENTH_NOTES))
+            self._select_note_sprites(
+                repo.SIXTEENTH_NOTES, repo.SIXTEENTH_NOTES_FLIPPED
+            )
         super().select_sprites(repo)
-
-    def place_sprites(self):
-        super().place_sprites()
-
-        if self.flipped:
-            f = self.sprites.sprite("flag_8")
-            f.mask = np.flip(f.mask, axis=1)
-            f.x += f.width
-
-            if self.kind == "s":
-                f = self.sprites.sprite("flag_16")
-                f.mask = np.flip(f.mask, axis=1)
-                f.x += f.width
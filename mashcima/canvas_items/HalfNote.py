@@ -1,7 +1,5 @@
 from mashcima.SymbolRepository import SymbolRepository
 from mashcima.canvas_items.StemNote import StemNote
-import random
-import copy
 
 
 class HalfNote(StemNote):
@@ -9,5 +7,5 @@ class HalfNote(StemNote):
         return "h"
 
     def select_sprites(self, repo: SymbolRepository):
-        self.sprites = copy.deepcopy(random.choice(repo.HALF_NOTES))
+        self._select_note_sprites(repo.HALF_NOTES, repo.HALF_NOTES_FLIPPED)
         super().select_sprites(repo)
@@ -2,7 +2,6 @@ from mashcima.SymbolRepository import SymbolRepository
 from mashcima.canvas_items.CanvasItem import CanvasItem
 from mashcima.Sprite import Sprite
 import random
-import copy
 from typing import Dict, List
 
 
@@ -28,11 +27,11 @@ class KeySignature(CanvasItem):
         for i, t in enumerate(self.types):
             s = None
             if t == "#":
-                s = copy.deepcopy(random.choice(repo.SHARPS))
+                s = random.choice(repo.SHARPS).copy()
             if t == "b":
-                s = copy.deepcopy(random.choice(repo.FLATS))
+                s = random.choice(repo.FLATS).copy()
             if t == "N":
-                s = copy.deepcopy(random.choice(repo.NATURALS))
+                s = random.choice(repo.NATURALS).copy()
             assert s is not None
             self.sprites.add("item_" + str(i), s)
             self.item_sprites.append(s)
@@ -2,9 +2,7 @@ from mashcima.SymbolRepository import SymbolRepository
 from mashcima.canvas_items.SlurableItem import SlurableItem
 from mashcima.Sprite import Sprite
 from typing import Dict, List, Tuple, Optional
-import numpy as np
 import random
-import copy
 from mashcima.DurationDots import DurationDots
 
 
@@ -73,18 +71,19 @@ class Note(SlurableItem):
         self._place_ledger_lines(pitch_positions)
         return out
         
-    def render(self, img: np.ndarray):
-        self._render_ledger_lines(img)
-        super().render(img)
+    def add_to_scene(self, scene, repo: SymbolRepository):
+        self._add_ledger_lines_to_scene(scene, repo)
+        super().add_to_scene(scene, repo)
 
     #########################
     # Ledger line rendering #
     #########################
 
-    def _render_ledger_lines(self, img: np.ndarray):
+    def _add_ledger_lines_to_scene(self, scene, repo: SymbolRepository):
         for i, s in enumerate(self._ledger_line_sprites):
-            s.render(
-                img,
+            scene.add_sprite(
+                repo,
+                s,
                 self.sprites.position_x,
                 self._ledger_line_y_positions[i]
             )
@@ -117,11 +116,11 @@ class Note(SlurableItem):
             return
         sprite = None
         if self.accidental == "#":
-            sprite = copy.deepcopy(random.choice(repo.SHARPS))
+            sprite = random.choice(repo.SHARPS).copy()
         if self.accidental == "b":
-            sprite = copy.deepcopy(random.choice(repo.FLATS))
+            sprite = random.choice(repo.FLATS).copy()
         if self.accidental == "N":
-            sprite = copy.deepcopy(random.choice(repo.NATURALS))
+            sprite = random.choice(repo.NATURALS).copy()
         assert sprite is not None
         self.sprites.add("accidental", sprite)
 
@@ -141,7 +140,7 @@ class Note(SlurableItem):
     def _select_staccacto_dot_sprite(self, repo: SymbolRepository):
         if not self.staccato:
             return
-        self.sprites.add("staccato", copy.deepcopy(random.choice(repo.DOTS)))
+        self.sprites.add("staccato", random.choice(repo.DOTS).copy())
 
     def _place_staccato_dot(self):
         if not self.staccato:
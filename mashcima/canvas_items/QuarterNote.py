@@ -1,7 +1,5 @@
 from mashcima.SymbolRepository import SymbolRepository
 from mashcima.canvas_items.StemNote import StemNote
-import random
-import copy
 
 
 class QuarterNote(StemNote):
@@ -9,5 +7,5 @@ class QuarterNote(StemNote):
         return "q"
 
     def select_sprites(self, repo: SymbolRepository):
-        self.sprites = copy.deepcopy(random.choice(repo.QUARTER_NOTES))
+        self._select_note_sprites(repo.QUARTER_NOTES, repo.QUARTER_NOTES_FLIPPED)
         super().select_sprites(repo)
@@ -3,7 +3,6 @@ from mashcima.canvas_items.CanvasItem import CanvasItem
 from mashcima.DurationDots import DurationDots
 from typing import Optional, Dict, List
 import random
-import copy
 
 
 class Rest(CanvasItem):
@@ -37,19 +36,19 @@ class Rest(CanvasItem):
 
     def select_sprites(self, repo: SymbolRepository):
         if self.kind == "lr":
-            self.sprites = copy.deepcopy(random.choice(repo.LONGA_RESTS))
+            self.sprites = random.choice(repo.LONGA_RESTS).copy()
         if self.kind == "br":
-            self.sprites = copy.deepcopy(random.choice(repo.BREVE_RESTS))
+            self.sprites = random.choice(repo.BREVE_RESTS).copy()
         if self.kind == "wr":
-            self.sprites = copy.deepcopy(random.choice(repo.WHOLE_RESTS))
+            self.sprites = random.choice(repo.WHOLE_RESTS).copy()
         if self.kind == "hr":
-            self.sprites = copy.deepcopy(random.choice(repo.HALF_RESTS))
+            self.sprites = random.choice(repo.HALF_RESTS).copy()
         if self.kind == "qr":
-            self.sprites = copy.deepcopy(random.choice(repo.QUARTER_RESTS))
+            self.sprites = random.choice(repo.QUARTER_RESTS).copy()
         if self.kind == "er":
-            self.sprites = copy.deepcopy(random.choice(repo.EIGHTH_RESTS))
+            self.sprites = random.choice(repo.EIGHTH_RESTS).copy()
         if self.kind == "sr":
-            self.sprites = copy.deepcopy(random.choice(repo.SIXTEENTH_RESTS))
+            self.sprites = random.choice(repo.SIXTEENTH_RESTS).copy()
 
         self.duration_dots.select_sprites(repo)
         super().select_sprites(repo)
@@ -1,6 +1,8 @@
 from mashcima.SymbolRepository import SymbolRepository
+from mashcima.SpriteGroup import SpriteGroup
 from mashcima.canvas_items.Note import Note
 from mashcima.debug import draw_cross
+from typing import List, Optional
 import numpy as np
 import random
 
@@ -13,6 +15,10 @@ class StemNote(Note):
         # decided in select_sprites(...)
         self.flipped = False
 
+        # the selected note sprites flipped upside-down
+        # (taken from the repository, must not be modified)
+        self._flipped_note_sprites: Optional[SpriteGroup] = None
+
     @property
     def stem_head_x(self):
         return self.sprites.point("stem_head")[0]
@@ -21,6 +27,16 @@ class StemNote(Note):
     def stem_head_y(self):
         return self.sprites.point("stem_head")[1]
 
+    def _select_note_sprites(
+            self,
+            notes: List[SpriteGroup],
+            flipped_notes: List[SpriteGroup]
+    ):
+        """Selects a random note from a repository list and its flipped variant"""
+        i = random.randrange(len(notes))
+        self.sprites = notes[i].copy()
+        self._flipped_note_sprites = flipped_notes[i]
+
     def select_sprites(self, repo: SymbolRepository):
         super().select_sprites(repo)
 
@@ -31,21 +47,20 @@ class StemNote(Note):
 
     def place_sprites(self):
         if self.flipped:
-            self.sprites = self.sprites.create_flipped_copy(
-                [
-                    "notehead", "stem", "stem_head",
-                    "flag_8", "flag_16", "flag_32"
-                ]
-            )
+            # swap note sprites for the flipped ones,
+            # attachments (accidentals, dots, ...) stay as they are
+            flipped = self._flipped_note_sprites.copy()
+            self.sprites.sprites.update(flipped.sprites)
+            self.sprites.points.update(flipped.points)
+            self.sprites.stamp = flipped.stamp
+            self.sprites.stamped_names = flipped.stamped_names
         super().place_sprites()
 
-    def render(self, img: np.ndarray):
-        super().render(img)
-
-        if self.DEBUG_RENDER:
-            draw_cross(
-                img,
-                self.sprites.position_x + self.stem_head_x,
-                self.sprites.position_y + self.stem_head_y,
-                5
-            )
+    def render_debug(self, img: np.ndarray):
+        super().render_debug(img)
+        draw_cross(
+            img,
+            self.sprites.position_x + self.stem_head_x,
+            self.sprites.position_y + self.stem_head_y,
+            5
+        )
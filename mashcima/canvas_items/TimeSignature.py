@@ -1,7 +1,6 @@
 from mashcima.SymbolRepository import SymbolRepository
 from mashcima.canvas_items.CanvasItem import CanvasItem
 import random
-import copy
 from typing import Dict
 
 
@@ -19,12 +18,12 @@ class TimeSignature(CanvasItem):
         ]
 
     def select_sprites(self, repo: SymbolRepository):
-        top_sprite = copy.deepcopy(
-            random.choice(repo.TIME_MARKS["time_" + str(self.top)]).sprite("symbol")
-        )
-        bottom_sprite = copy.deepcopy(
-            random.choice(repo.TIME_MARKS["time_" + str(self.bottom)]).sprite("symbol")
-        )
+        top_sprite = random.choice(
+            repo.TIME_MARKS["time_" + str(self.top)]
+        ).sprite("symbol").copy()
+        bottom_sprite = random.choice(
+            repo.TIME_MARKS["time_" + str(self.bottom)]
+        ).sprite("symbol").copy()
         top_sprite.y -= top_sprite.height // 2 + random.randint(5, 10)
         bottom_sprite.y += bottom_sprite.height // 2 + random.randint(5, 10)
         self.sprites.add("top", top_sprite)
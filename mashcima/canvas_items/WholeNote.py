@@ -1,7 +1,6 @@
 from mashcima.SymbolRepository import SymbolRepository
 from mashcima.canvas_items.Note import Note
 import random
-import copy
 
 
 class WholeNote(Note):
@@ -9,5 +8,5 @@ class WholeNote(Note):
         return "w"
     
     def select_sprites(self, repo: SymbolRepository):
-        self.sprites = copy.deepcopy(random.choice(repo.WHOLE_NOTES))
+        self.sprites = random.choice(repo.WHOLE_NOTES).copy()
         super().select_sprites(repo)
@@ -1,10 +1,7 @@
 from mashcima.SymbolRepository import SymbolRepository
 from mashcima.canvas_items.CanvasItem import CanvasItem
 import random
-import copy
-from typing import Dict
-import numpy as np
-import cv2
+from typing import Dict, Optional, Tuple
 
 
 class WholeTimeSignature(CanvasItem):
@@ -13,6 +10,9 @@ class WholeTimeSignature(CanvasItem):
 
         self.crossed = crossed
 
+        # set in prepare_render
+        self._cross_line: Optional[Tuple[Tuple[int, int], Tuple[int, int]]] = None
+
     def get_item_annotation_token(self):
         if self.crossed:
             return "time.C/"
@@ -20,7 +20,7 @@ class WholeTimeSignature(CanvasItem):
             return "time.C"
 
     def select_sprites(self, repo: SymbolRepository):
-        self.sprites = copy.deepcopy(random.choice(repo.TIME_MARKS["time_c"]))
+        self.sprites = random.choice(repo.TIME_MARKS["time_c"]).copy()
         super().select_sprites(repo)
 
     def place_item(self, head: int, pitch_positions: Dict[int, int]) -> int:
@@ -28,12 +28,12 @@ class WholeTimeSignature(CanvasItem):
         self.sprites.position_y = pitch_positions[0]
         return out
 
-    def render(self, img: np.ndarray):
-        super().render(img)
-        sprite = self.sprites.sprite("symbol")
+    def prepare_render(self):
+        # the crossing line, in canvas pixel space
+        self._cross_line = None
         if self.crossed:
-            cv2.line(
-                img,
+            sprite = self.sprites.sprite("symbol")
+            self._cross_line = (
                 (
                     self.sprites.position_x + random.randint(-5, 5) + 5,
                     self.sprites.position_y - int(sprite.height * 0.7)
@@ -41,7 +41,10 @@ class WholeTimeSignature(CanvasItem):
                 (
                     self.sprites.position_x + random.randint(-5, 5) - 5,
                     self.sprites.position_y + int(sprite.height * 0.7)
-                ),
-                thickness=3,
-                color=1
+                )
             )
+
+    def add_to_scene(self, scene, repo: SymbolRepository):
+        super().add_to_scene(scene, repo)
+        if self._cross_line is not None:
+            scene.add_line(self._cross_line[0], self._cross_line[1], 3)
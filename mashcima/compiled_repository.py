@@ -0,0 +1,174 @@
+import os
+import io
+import json
+import pickle
+import hashlib
+import numpy as np
+from typing import Optional, List, Dict, Any, Tuple
+from mashcima.Config import Config
+
+
+# Bump this number whenever the symbol extraction or the structure
+# of sprites changes, so that stale compiled repositories get rebuilt.
+COMPILED_REPOSITORY_FORMAT = 8
+
+# masks in the atlas start at offsets aligned to this many bytes
+_ATLAS_ALIGNMENT = 64
+
+
+class _AtlasPickler(pickle.Pickler):
+    """
+    Pickles sprite masks as references into a separate mask list,
+    that is later stored as one contiguous atlas file
+    """
+    def __init__(self, file):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.masks: List[np.ndarray] = []
+        self._mask_indices: Dict[int, int] = {}
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, np.ndarray):
+            return None
+        if id(obj) not in self._mask_indices:
+            self._mask_indices[id(obj)] = len(self.masks)
+            self.masks.append(obj)
+        return "mask", self._mask_indices[id(obj)]
+
+
+class _AtlasUnpickler(pickle.Unpickler):
+    """Resolves mask references as views into the memory-mapped atlas"""
+    def __init__(self, file, masks: List[np.ndarray]):
+        super().__init__(file)
+        self.masks = masks
+
+    def persistent_load(self, pid):
+        kind, index = pid
+        if kind != "mask":
+            raise pickle.UnpicklingError("Unknown persistent id: " + str(kind))
+        return self.masks[index]
+
+
+def _get_mashcima_version() -> str:
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:  # python < 3.8
+        return "unknown"
+    try:
+        return version("mashcima")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def get_compiled_repository_path(
+        config: Config,
+        documents: Optional[List[str]],
+        take_writers: Optional[List[int]],
+        skip_writers: Optional[List[int]]
+) -> str:
+    """
+    Returns the path to the compiled repository directory for the given
+    filters. The directory name is a hash of the filters, the dataset
+    location, the mashcima version and the compiled format version.
+    Each group of symbol lists is then compiled into its own file.
+    """
+    key = json.dumps({
+        "format": COMPILED_REPOSITORY_FORMAT,
+        "version": _get_mashcima_version(),
+        "muscima_pp_path": os.path.abspath(config.MUSCIMA_PP_PATH),
+        "documents": None if documents is None else sorted(documents),
+        "take_writers": None if take_writers is None else sorted(take_writers),
+        "skip_writers": None if skip_writers is None else sorted(skip_writers),
+    }, sort_keys=True)
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(config.COMPILED_REPOSITORIES_DIRECTORY, digest)
+
+
+def _get_atlas_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".masks"
+
+
+def _open_atlas(
+        atlas_path: str,
+        table: List[Tuple[int, Tuple[int, ...], str]],
+        atlas_size: int
+) -> List[np.ndarray]:
+    """
+    Memory-maps the atlas file read-only and returns views for all masks.
+    Processes that map the same file share the same physical memory pages.
+    """
+    if atlas_size == 0:
+        return []
+    buffer = np.memmap(atlas_path, dtype=np.uint8, mode="r")
+    if buffer.shape[0] != atlas_size:
+        raise ValueError("Mask atlas has unexpected size")
+    buffer = buffer.view(np.ndarray)  # drop the memmap subclass
+    masks = []
+    for offset, shape, dtype in table:
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape)) * dtype.itemsize
+        masks.append(buffer[offset:offset + size].view(dtype).reshape(shape))
+    return masks
+
+
+def load_compiled_repository(path: str) -> Optional[Dict[str, Any]]:
+    """Loads compiled symbol lists, returns None if missing or unreadable"""
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            compiled = pickle.load(f)
+        if compiled.get("format") != COMPILED_REPOSITORY_FORMAT:
+            return None
+        masks = _open_atlas(
+            _get_atlas_path(path),
+            compiled["atlas_table"],
+            compiled["atlas_size"]
+        )
+        return _AtlasUnpickler(io.BytesIO(compiled["symbols"]), masks).load()
+    except (pickle.UnpicklingError, EOFError, AttributeError, ImportError,
+            KeyError, IndexError, ValueError, OSError):
+        print("Ignoring corrupted compiled repository: " + path)
+        return None
+
+
+def save_compiled_repository(path: str, symbols: Dict[str, Any]):
+    """
+    Stores extracted symbol lists so that they need not be extracted again.
+    Sprite masks are packed into one contiguous atlas file next to the
+    pickled symbol structure.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # pickle the structure, collecting masks along the way
+    symbols_file = io.BytesIO()
+    pickler = _AtlasPickler(symbols_file)
+    pickler.dump(symbols)
+
+    # write into temporary files first, so that an interrupted
+    # write does not leave broken files behind
+    atlas_path = _get_atlas_path(path)
+    tmp_suffix = ".tmp." + str(os.getpid())
+
+    table = []
+    offset = 0
+    with open(atlas_path + tmp_suffix, "wb") as f:
+        for mask in pickler.masks:
+            data = np.ascontiguousarray(mask)
+            table.append((offset, data.shape, data.dtype.str))
+            f.write(data.tobytes())
+            offset += data.nbytes
+            padding = -offset % _ATLAS_ALIGNMENT
+            f.write(bytes(padding))
+            offset += padding
+
+    with open(path + tmp_suffix, "wb") as f:
+        pickle.dump({
+            "format": COMPILED_REPOSITORY_FORMAT,
+            "atlas_table": table,
+            "atlas_size": offset,
+            "symbols": symbols_file.getvalue()
+        }, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    # the atlas goes first, the pickle marks the repository as complete
+    os.replace(atlas_path + tmp_suffix, atlas_path)
+    os.replace(path + tmp_suffix, path)
@@ -4,21 +4,28 @@ from muscima.io import parse_cropobject_list
 from typing import Tuple, Dict
 from mashcima.Config import Config
 from mashcima.vocabulary import HIGHEST_PITCH, LOWEST_PITCH
+from mashcima.utils import get_ink_value
 
 
 # to prevent the XML from being loaded each time this method gets called
 _staff_line_cache = None
 
 
-def generate_staff_lines(config=None) -> Tuple[np.ndarray, Dict[int, int]]:
-    """Generates an image of a staff with pixel positions of note positions"""
+def generate_staff_lines(
+        config=None,
+        dtype=np.float32
+) -> Tuple[np.ndarray, Dict[int, int]]:
+    """
+    Generates an image of a staff with pixel positions of note positions.
+    Staff lines have the ink value of the image dtype (1.0 for float32).
+    """
     global _staff_line_cache
 
     if config is None:
         config = Config.load_default()
 
     if _staff_line_cache is not None:
-        return _staff_line_cache[0].copy(), _staff_line_cache[1]
+        return _staff_lines_image(_staff_line_cache[0], dtype), _staff_line_cache[1]
 
     doc = parse_cropobject_list(
         os.path.join(
@@ -71,6 +78,26 @@ def generate_staff_lines(config=None) -> Tuple[np.ndarray, Dict[int, int]]:
     # for c in positions:
     #     img[c, :] = 0.5
 
-    _staff_line_cache = (img.copy(), position_dict)
+    _staff_line_cache = (img.astype(np.bool_), position_dict)
+
+    return _staff_lines_image(_staff_line_cache[0], dtype), position_dict
+
+
+def _staff_lines_image(mask: np.ndarray, dtype) -> np.ndarray:
+    img = np.zeros(shape=mask.shape, dtype=dtype)
+    img[mask] = get_ink_value(dtype)
+    return img
+
 
-    return img, position_dict
+def get_staff_lines_columns(staff_img: np.ndarray, x: int, width: int) -> np.ndarray:
+    """
+    Returns columns from x to x + width of the staff lines image,
+    the staff lines get extended by mirroring when reaching over its right
+    end (mirroring, unlike tiling, keeps the lines continuous)
+    """
+    if x + width <= staff_img.shape[1]:
+        return staff_img[:, x:(x + width)]
+    staff_width = staff_img.shape[1]
+    columns = np.arange(x, x + width) % (staff_width * 2)
+    columns = np.where(columns < staff_width, columns, staff_width * 2 - 1 - columns)
+    return staff_img[:, columns]
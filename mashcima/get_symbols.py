@@ -1,21 +1,45 @@
 import numpy as np
 from mashcima.utils import has_outlink_to, get_outlink_to
-from mashcima.utils import get_connected_components_not_touching_image_border
-from mashcima.utils import sort_components_by_proximity_to_point
+from mashcima.utils import get_centers_of_components_not_touching_image_border
 from mashcima.utils import get_center_of_component
 from mashcima.SymbolRepository import SymbolRepository
 from mashcima.Sprite import Sprite
 from mashcima.SpriteGroup import SpriteGroup
-from typing import List, Tuple, Dict
-from muscima.io import CropObject
+from typing import List, Tuple, Dict, TYPE_CHECKING
 import cv2
 
+if TYPE_CHECKING:
+    from muscima.io import CropObject
+
 
 ###################
 # Utility methods #
 ###################
 
 
+def _tag_source(item, obj: "CropObject"):
+    """Tags an extracted symbol with the document it comes from"""
+    item.source_document = obj.doc
+    return item
+
+
+def create_flipped_note(item: SpriteGroup) -> SpriteGroup:
+    """
+    Returns the note flipped upside-down (with its stem pointing the other
+    way), flags are mirrored back so that they keep pointing to the right
+    """
+    item = item.create_flipped_copy([
+        "notehead", "stem", "stem_head",
+        "flag_8", "flag_16", "flag_32"
+    ])
+    for flag_name in ["flag_8", "flag_16", "flag_32"]:
+        if flag_name in item.sprites:
+            f = item.sprite(flag_name)
+            f.flip_horizontally()
+            f.x += f.width
+    return item
+
+
 def _build_notehead_stem_pairs(noteheads, stems, flags8=None, flags16=None):
     """
     Combines list of noteheads and a list of stems into a list of
@@ -60,17 +84,7 @@ def _build_notehead_stem_pairs(noteheads, stems, flags8=None, flags16=None):
             ))
 
         if flip:
-            item = item.create_flipped_copy()
-
-            if flags8 is not None:
-                f = item.sprite("flag_8")
-                f.mask = np.flip(f.mask, axis=1)
-                f.x += f.width
-
-            if flags16 is not None:
-                f = item.sprite("flag_16")
-                f.mask = np.flip(f.mask, axis=1)
-                f.x += f.width
+            item = create_flipped_note(item)
 
         stem_sprite = item.sprite("stem")
         item.add_point("stem_head", (
@@ -78,30 +92,23 @@ def _build_notehead_stem_pairs(noteheads, stems, flags8=None, flags16=None):
             stem_sprite.y
         ))
 
-        items.append(item)
+        items.append(_tag_source(item, h))
 
     return items
 
 
 def _get_y_position_of_staff_line(
         repo: SymbolRepository,
-        obj: CropObject,
+        obj: "CropObject",
         line_from_top: int = 0
 ):
     """
     Given a CropObject it finds the y-coordinate of the corresponding staff line
     """
     staff = get_outlink_to(repo, obj, "staff")
-    staff_line = None
-    line = 0
-    for l in staff.outlinks:
-        resolved_link = repo.CROP_OBJECT_LOOKUP_DICTS[obj.doc][l]
-        if resolved_link.clsname == "staff_line":
-            if line == line_from_top:  # counted from top, from zero
-                staff_line = resolved_link
-                break
-            line += 1
-    assert staff_line is not None
+    staff_lines = repo.get_outlinks(staff, "staff_line")
+    assert line_from_top < len(staff_lines)  # counted from top, from zero
+    staff_line = staff_lines[line_from_top]
     return (staff_line.top + staff_line.bottom) // 2
 
 
@@ -115,10 +122,7 @@ def _get_symbols_centered_on_line(
     """
     Returns list of symbols with given clsname centered on given line index
     """
-    crop_objects = [
-        o for o in repo.CROP_OBJECTS
-        if o.clsname in [clsname]
-    ]
+    crop_objects = repo.get_crop_objects(clsname)
 
     items = []
     for o in crop_objects:
@@ -129,7 +133,7 @@ def _get_symbols_centered_on_line(
             o.mask
         )
         item.add(sprite_name, sprite)
-        items.append(item)
+        items.append(_tag_source(item, o))
 
         if (-sprite.y < 0 or -sprite.y > sprite.height) and when_center_outside_recenter:
             sprite.y = -sprite.height // 2
@@ -144,9 +148,8 @@ def _get_symbols_centered_on_line(
 
 def get_whole_notes(repo: SymbolRepository) -> List[SpriteGroup]:
     crop_objects = [
-        o for o in repo.CROP_OBJECTS
-        if o.clsname == "notehead-empty"
-        and not has_outlink_to(repo, o, "ledger_line")
+        o for o in repo.get_crop_objects("notehead-empty")
+        if not has_outlink_to(repo, o, "ledger_line")
     ]
 
     items = []
@@ -157,16 +160,15 @@ def get_whole_notes(repo: SymbolRepository) -> List[SpriteGroup]:
             -o.height // 2,
             o.mask
         ))
-        items.append(item)
+        items.append(_tag_source(item, o))
 
     return items
 
 
 def get_half_notes(repo: SymbolRepository) -> List[SpriteGroup]:
     noteheads = [
-        o for o in repo.CROP_OBJECTS
-        if o.clsname == "notehead-empty"
-        and has_outlink_to(repo, o, "stem")
+        o for o in repo.get_crop_objects("notehead-empty")
+        if has_outlink_to(repo, o, "stem")
         and not has_outlink_to(repo, o, "ledger_line")
     ]
     stems = [get_outlink_to(repo, o, "stem") for o in noteheads]
@@ -175,9 +177,8 @@ def get_half_notes(repo: SymbolRepository) -> List[SpriteGroup]:
 
 def get_quarter_notes(repo: SymbolRepository) -> List[SpriteGroup]:
     noteheads = [
-        o for o in repo.CROP_OBJECTS
-        if o.clsname == "notehead-full"
-        and has_outlink_to(repo, o, "stem")
+        o for o in repo.get_crop_objects("notehead-full")
+        if has_outlink_to(repo, o, "stem")
     ]
     stems = [get_outlink_to(repo, o, "stem") for o in noteheads]
     return _build_notehead_stem_pairs(noteheads, stems)
@@ -185,10 +186,9 @@ def get_quarter_notes(repo: SymbolRepository) -> List[SpriteGroup]:
 
 def get_eighth_notes(repo: SymbolRepository) -> List[SpriteGroup]:
     noteheads = [
-        o for o in repo.CROP_OBJECTS
-        if o.clsname == "notehead-full"
-           and has_outlink_to(repo, o, "stem")
-           and has_outlink_to(repo, o, "8th_flag")
+        o for o in repo.get_crop_objects("notehead-full")
+        if has_outlink_to(repo, o, "stem")
+        and has_outlink_to(repo, o, "8th_flag")
     ]
     stems = [get_outlink_to(repo, o, "stem") for o in noteheads]
     flags = [get_outlink_to(repo, o, "8th_flag") for o in noteheads]
@@ -197,11 +197,10 @@ def get_eighth_notes(repo: SymbolRepository) -> List[SpriteGroup]:
 
 def get_sixteenth_notes(repo: SymbolRepository) -> List[SpriteGroup]:
     noteheads = [
-        o for o in repo.CROP_OBJECTS
-        if o.clsname == "notehead-full"
-           and has_outlink_to(repo, o, "stem")
-           and has_outlink_to(repo, o, "8th_flag")
-           and has_outlink_to(repo, o, "16th_flag")
+        o for o in repo.get_crop_objects("notehead-full")
+        if has_outlink_to(repo, o, "stem")
+        and has_outlink_to(repo, o, "8th_flag")
+        and has_outlink_to(repo, o, "16th_flag")
     ]
     stems = [get_outlink_to(repo, o, "stem") for o in noteheads]
     flags8 = [get_outlink_to(repo, o, "8th_flag") for o in noteheads]
@@ -290,10 +289,7 @@ def get_sixteenth_rests(repo: SymbolRepository) -> List[SpriteGroup]:
 
 
 def get_accidentals(repo: SymbolRepository) -> Tuple[List[Sprite], List[Sprite], List[Sprite]]:
-    crop_objects = [
-        o for o in repo.CROP_OBJECTS
-        if o.clsname in ["sharp", "flat", "natural"]
-    ]
+    crop_objects = repo.get_crop_objects("sharp", "flat", "natural")
 
     sharps = []
     flats = []
@@ -304,26 +300,24 @@ def get_accidentals(repo: SymbolRepository) -> Tuple[List[Sprite], List[Sprite],
         # and handle open accidentals by repeatedly dilating
         # (dilate vertically twice as much)
         object_center_x, object_center_y = get_center_of_component(o.mask)
-        mask = (o.mask * 255).astype(dtype=np.uint8)
+        mask = o.mask.astype(dtype=np.uint8)
         sprite = None
         for i in range(5):
-            components = get_connected_components_not_touching_image_border(
-                1 - (mask // 255)
-            )
-            components = sort_components_by_proximity_to_point(
-                components,
-                object_center_x,
-                object_center_y
+            centers = get_centers_of_components_not_touching_image_border(
+                1 - mask
             )
 
-            if len(components) == 0:
+            if len(centers) == 0:
                 kernel = np.ones((5, 3), np.uint8)
                 mask = cv2.dilate(mask, kernel, iterations=1)
                 continue
 
-            component_center_x, component_center_y = get_center_of_component(
-                components[0]
-            )
+            # the component closest to the object center
+            # (the first one in the component order on ties)
+            distances = (centers[:, 0] - object_center_x) ** 2 \
+                + (centers[:, 1] - object_center_y) ** 2
+            component_center_x, component_center_y = \
+                centers[np.argmin(distances)].tolist()
             sprite = Sprite(
                 -component_center_x,
                 -component_center_y,
@@ -356,6 +350,7 @@ def get_accidentals(repo: SymbolRepository) -> Tuple[List[Sprite], List[Sprite],
                     o.mask
                 )
 
+        _tag_source(sprite, o)
         if o.clsname == "sharp":
             sharps.append(sprite)
         elif o.clsname == "flat":
@@ -367,28 +362,24 @@ def get_accidentals(repo: SymbolRepository) -> Tuple[List[Sprite], List[Sprite],
 
 
 def get_dots(repo: SymbolRepository) -> List[Sprite]:
-    crop_objects = [
-        o for o in repo.CROP_OBJECTS
-        if o.clsname in ["duration-dot", "staccato-dot", "other-dot"]
-    ]
+    crop_objects = repo.get_crop_objects(
+        "duration-dot", "staccato-dot", "other-dot"
+    )
 
     dots = []
     for o in crop_objects:
         object_center_x, object_center_y = get_center_of_component(o.mask)
-        dots.append(Sprite(
+        dots.append(_tag_source(Sprite(
             -object_center_x,
             -object_center_y,
             o.mask
-        ))
+        ), o))
 
     return dots
 
 
 def get_ledger_lines(repo: SymbolRepository) -> List[Sprite]:
-    crop_objects = [
-        o for o in repo.CROP_OBJECTS
-        if o.clsname in ["ledger_line"]
-    ]
+    crop_objects = repo.get_crop_objects("ledger_line")
 
     lines = []
     for o in crop_objects:
@@ -396,11 +387,11 @@ def get_ledger_lines(repo: SymbolRepository) -> List[Sprite]:
             print("Skipping invalid ledger line: ", o.uid)
             continue
         object_center_x, object_center_y = get_center_of_component(o.mask)
-        lines.append(Sprite(
+        lines.append(_tag_source(Sprite(
             -object_center_x,
             -object_center_y,
             o.mask
-        ))
+        ), o))
 
     return lines
 
@@ -408,10 +399,7 @@ def get_ledger_lines(repo: SymbolRepository) -> List[Sprite]:
 def get_barlines(repo: SymbolRepository) -> Tuple[List[SpriteGroup], List[SpriteGroup]]:
     TALL_BARLINE_THRESHOLD = 150
 
-    crop_objects = [
-        o for o in repo.CROP_OBJECTS
-        if o.clsname in ["thin_barline"]
-    ]
+    crop_objects = repo.get_crop_objects("thin_barline")
 
     items = []
     for o in crop_objects:
@@ -423,7 +411,7 @@ def get_barlines(repo: SymbolRepository) -> Tuple[List[SpriteGroup], List[Sprite
             print_render_warnings=(False if o.height > 350 else True)
         ))
         item.recalculate_bounding_box()  # needed for .height to be set
-        items.append(item)
+        items.append(_tag_source(item, o))
 
     return (
         list(filter(lambda i: i.height < TALL_BARLINE_THRESHOLD, items)),
@@ -450,10 +438,7 @@ def get_f_clefs(repo: SymbolRepository) -> List[SpriteGroup]:
 
 
 def get_c_clefs(repo: SymbolRepository) -> List[SpriteGroup]:
-    crop_objects = [
-        o for o in repo.CROP_OBJECTS
-        if o.clsname in ["c-clef"]
-    ]
+    crop_objects = repo.get_crop_objects("c-clef")
 
     items = []
     for o in crop_objects:
@@ -463,16 +448,13 @@ def get_c_clefs(repo: SymbolRepository) -> List[SpriteGroup]:
             -o.height // 2,
             o.mask
         ))
-        items.append(item)
+        items.append(_tag_source(item, o))
 
     return items
 
 
 def get_time_marks(repo: SymbolRepository) -> Dict[str, List[SpriteGroup]]:
-    crop_objects = [
-        o for o in repo.CROP_OBJECTS
-        if o.clsname in ["time_signature"]
-    ]
+    crop_objects = repo.get_crop_objects("time_signature")
 
     KEY_MAP = {
         "numeral_0": "time_0",
@@ -513,6 +495,6 @@ def get_time_marks(repo: SymbolRepository) -> Dict[str, List[SpriteGroup]]:
                 -outlink.height // 2,
                 outlink.mask
             ))
-            items[KEY_MAP[outlink.clsname]].append(item)
+            items[KEY_MAP[outlink.clsname]].append(_tag_source(item, o))
 
     return items
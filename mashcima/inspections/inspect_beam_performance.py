@@ -0,0 +1,78 @@
+import time
+import random
+import numpy as np
+from mashcima.SymbolRepository import SymbolRepository
+from mashcima.Canvas import Canvas
+from mashcima.Scene import Scene
+from mashcima.Beam import get_beam_polygons, BEAM_THICKNESS
+from mashcima.annotation_to_image import annotation_to_canvas
+from mashcima.generate_staff_lines import generate_staff_lines
+from mashcima.utils import draw_line, fill_polygons
+
+# Measures beam placement and rasterization on long beamed groups
+# of sixteenths and thirty-seconds, and compares the filled beam
+# polygons with beams drawn line by line.
+
+REPEATS = 200
+GROUPS = {
+    "sixteenths": "s=-4 =s=-2 =s=0 =s=2 =s=4 =s=2 =s=0 =s-2",
+    "thirty-seconds": "t=4 =t=6 =t=8 =t=6 =t=4 =t=2 =t=0 =t-2",
+}
+
+repo = SymbolRepository.load_default()
+staff_img, pitch_positions = generate_staff_lines(repo.CONFIG)
+
+# the staff is in the middle of an image three staves tall
+# (like the main staff of multi_staff_annotation_to_image)
+# and images are allocated upfront, so that page faults are not measured
+height, width = staff_img.shape[0] * 3, staff_img.shape[1]
+pitch_positions = {p: y + staff_img.shape[0] for p, y in pitch_positions.items()}
+polygons_img = np.zeros(shape=(height, width), dtype=np.float32)
+lines_img = np.zeros(shape=(height, width), dtype=np.float32)
+
+for name, group in GROUPS.items():
+    annotation = " ".join([group] * 4)
+    random.seed(42)
+
+    place_time = 0
+    polygon_time = 0
+    line_time = 0
+    overlap = 0
+    union = 0
+    for _ in range(REPEATS):
+        canvas = Canvas()
+        annotation_to_canvas(canvas, annotation)
+        canvas.place(repo, pitch_positions, 0)
+
+        start = time.perf_counter()
+        for beam in canvas.beams:
+            beam.place()
+            beam.prepare_render()
+        place_time += time.perf_counter() - start
+
+        scene = Scene(width, height)
+        for beam in canvas.beams:
+            beam.add_to_scene(scene)
+
+        polygons_img.fill(0)
+        start = time.perf_counter()
+        for chains in scene.beams:
+            fill_polygons(polygons_img, get_beam_polygons(chains))
+        polygon_time += time.perf_counter() - start
+
+        lines_img.fill(0)
+        start = time.perf_counter()
+        for beam in canvas.beams:
+            for a, b in beam._lines:
+                draw_line(lines_img, a, b, BEAM_THICKNESS)
+        line_time += time.perf_counter() - start
+
+        overlap += np.logical_and(polygons_img > 0, lines_img > 0).sum()
+        union += np.logical_or(polygons_img > 0, lines_img > 0).sum()
+
+    beam_count = REPEATS * len(canvas.beams)
+    print("%s (%d beams):" % (name, beam_count))
+    print("    placement:         %.1f us per beam" % (place_time / beam_count * 1e6))
+    print("    filled polygons:   %.1f us per beam" % (polygon_time / beam_count * 1e6))
+    print("    line by line:      %.1f us per beam" % (line_time / beam_count * 1e6))
+    print("    pixel overlap:     %.3f (intersection over union)" % (overlap / union))
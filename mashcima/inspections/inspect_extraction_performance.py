@@ -0,0 +1,60 @@
+import time
+from mashcima.SymbolRepository import SymbolRepository
+
+# Measures how long symbol extraction takes (without the compiled cache),
+# and compares crop object queries answered by the class name and outlink
+# indices with the linear scans the extractors used to do.
+
+REPEATS = 20
+
+repo = SymbolRepository(use_compiled_cache=False)
+
+start = time.perf_counter()
+repo.CROP_OBJECTS  # loads the documents and builds the indices
+print("documents and indices: %.0f ms (%d crop objects)" % (
+    (time.perf_counter() - start) * 1000, len(repo.CROP_OBJECTS)
+))
+
+total = 0
+for extractor, names in SymbolRepository.SYMBOL_EXTRACTORS.items():
+    start = time.perf_counter()
+    getattr(repo, names[0])  # loads all the lists of the extractor
+    duration = time.perf_counter() - start
+    total += duration
+    print("    %-26s %6.0f ms" % (extractor, duration * 1000))
+print("all extractors: %.0f ms" % (total * 1000))
+
+
+def _scan_crop_objects(*clsnames):
+    return [c for c in repo.CROP_OBJECTS if c.clsname in clsnames]
+
+
+def _scan_outlinks(obj, clsname):
+    lookup = repo.CROP_OBJECT_LOOKUP_DICTS[obj.doc]
+    return [lookup[l] for l in obj.outlinks if lookup[l].clsname == clsname]
+
+
+def _measure(f) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        f()
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+
+clsnames = ["sharp", "flat", "natural"]
+noteheads = repo.get_crop_objects("notehead-full", "notehead-empty")
+assert repo.get_crop_objects(*clsnames) == _scan_crop_objects(*clsnames)
+assert all(
+    repo.get_outlinks(o, "stem") == _scan_outlinks(o, "stem") for o in noteheads
+)
+
+print("accidentals by class name:")
+print("    index:        %.2f ms" % _measure(lambda: repo.get_crop_objects(*clsnames)))
+print("    linear scan:  %.2f ms" % _measure(lambda: _scan_crop_objects(*clsnames)))
+print("stems of all %d noteheads:" % len(noteheads))
+print("    index:        %.2f ms" % _measure(
+    lambda: [repo.get_outlinks(o, "stem") for o in noteheads]
+))
+print("    linear scan:  %.2f ms" % _measure(
+    lambda: [_scan_outlinks(o, "stem") for o in noteheads]
+))
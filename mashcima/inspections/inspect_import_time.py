@@ -0,0 +1,36 @@
+import sys
+import subprocess
+
+# Measures how long it takes a fresh interpreter to import parts of mashcima
+# that should stay lightweight, and checks that no heavy dependency
+# gets imported along the way.
+
+IMPORT_TIME_BUDGET_MS = 25
+REPEATS = 5
+MODULES = ["mashcima", "mashcima.vocabulary"]
+HEAVY_DEPENDENCIES = ["numpy", "cv2", "muscima", "tqdm", "requests", "tarfile"]
+
+_MEASURE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print((time.perf_counter() - start) * 1000)
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+for module in MODULES:
+    times = []
+    imported = ""
+    for _ in range(REPEATS):
+        output = subprocess.check_output([
+            sys.executable, "-c",
+            _MEASURE.format(module=module, heavy=HEAVY_DEPENDENCIES)
+        ]).decode("utf-8").splitlines()
+        times.append(float(output[0]))
+        imported = output[1]
+    best = min(times)
+    print("import %s: %.1f ms (budget %d ms)" % (module, best, IMPORT_TIME_BUDGET_MS))
+    if imported != "":
+        print("    heavy dependencies imported:", imported)
+    assert best <= IMPORT_TIME_BUDGET_MS, "Import time budget exceeded"
+    assert imported == "", "Heavy dependencies imported"
@@ -1,5 +1,4 @@
 from typing import Tuple, Generator, Optional
-import tarfile
 from mashcima.Config import Config
 from mashcima.vocabulary import parse_annotation_into_token_groups
 
@@ -69,6 +68,7 @@ def load_primus_as_mashcima_annotations(take=None, print_warnings=False, config=
 
 
 def _iterate_tgz_primus(path: str) -> Generator[Tuple[str, str], None, None]:
+    import tarfile
     with tarfile.open(path, "r:gz") as tar:
         while True:
             item = tar.next()
@@ -0,0 +1,191 @@
+import struct
+import zlib
+import numpy as np
+from mashcima.Scene import Scene
+from mashcima.SymbolRepository import SymbolRepository
+
+
+# Scene files start with this magic and the format number,
+# the rest of the file is zlib-compressed (all numbers little-endian)
+SCENE_FILE_MAGIC = b"MSCN"
+SCENE_FILE_FORMAT = 3
+
+# dtype codes of the transformation matrix
+_MATRIX_DTYPES = [None, np.float32, np.float64]
+
+_HEADER = struct.Struct("<4sB")
+_SIZES = struct.Struct("<IIIIIIIII")  # width, height, counts
+_BOX = struct.Struct("<iiii")
+_MATRIX_INFO = struct.Struct("<BII")  # dtype code, destination size
+_LIST = struct.Struct("<IB")  # fingerprint, name length
+_SPRITE = struct.Struct("<HIHiiB")  # list, item, name, x, y, stretch count
+
+# sprite name index of sprites that are not in a group
+_NO_NAME = 0xFFFF
+_LINE = struct.Struct("<iiiiB")
+_SLUR = struct.Struct("<iiiiii")
+
+
+def scene_to_bytes(scene: Scene, repo: SymbolRepository) -> bytes:
+    """
+    Serializes a scene into a compact binary form. The scene refers
+    to sprites by their keys, so it has to be loaded with the same
+    (compiled) symbol repository it was synthesized with.
+    """
+    # symbol lists and sprite names are stored once, sprites index them
+    list_names = sorted(set(key[0] for key, _, _, _ in scene.sprites))
+    sprite_names = sorted(set(
+        key[2] for key, _, _, _ in scene.sprites if key[2] is not None
+    ))
+    list_indices = {name: i for i, name in enumerate(list_names)}
+    name_indices = {name: i for i, name in enumerate(sprite_names)}
+    name_indices[None] = _NO_NAME
+
+    parts = [
+        _SIZES.pack(
+            len(list_names),
+            len(sprite_names),
+            scene.width,
+            scene.height,
+            len(scene.staves),
+            len(scene.sprites),
+            len(scene.beams),
+            len(scene.lines),
+            len(scene.slurs)
+        ),
+        _BOX.pack(*scene.box)
+    ]
+
+    # transformation
+    if scene.matrix is None:
+        parts.append(_MATRIX_INFO.pack(0, 0, 0))
+    else:
+        dtype_code = _MATRIX_DTYPES.index(scene.matrix.dtype.type)
+        parts.append(_MATRIX_INFO.pack(dtype_code, *scene.dest_size))
+        parts.append(np.ascontiguousarray(scene.matrix).tobytes())
+
+    parts.append(struct.pack("<%di" % len(scene.staves), *scene.staves))
+
+    # (fingerprints check that the lists hold the same sprites when loading)
+    for name in list_names:
+        encoded = name.encode("utf-8")
+        parts.append(_LIST.pack(repo.get_symbol_list_fingerprint(name), len(encoded)))
+        parts.append(encoded)
+    for name in sprite_names:
+        encoded = name.encode("utf-8")
+        parts.append(struct.pack("<B", len(encoded)))
+        parts.append(encoded)
+
+    for (list_name, index, sprite_name), stretches, x, y in scene.sprites:
+        parts.append(_SPRITE.pack(
+            list_indices[list_name], index, name_indices[sprite_name],
+            x, y, len(stretches)
+        ))
+        parts.append(struct.pack("<%dH" % len(stretches), *stretches))
+
+    for chains in scene.beams:
+        parts.append(struct.pack("<B", len(chains)))
+        for chain in chains:
+            parts.append(struct.pack("<H", len(chain)))
+            parts.append(struct.pack(
+                "<%di" % (2 * len(chain)), *[v for point in chain for v in point]
+            ))
+
+    for line in scene.lines:
+        parts.append(_LINE.pack(*line))
+
+    for slur in scene.slurs:
+        parts.append(_SLUR.pack(*slur))
+
+    return _HEADER.pack(SCENE_FILE_MAGIC, SCENE_FILE_FORMAT) \
+        + zlib.compress(b"".join(parts), 9)
+
+
+def scene_from_bytes(data: bytes, repo: SymbolRepository) -> Scene:
+    """Deserializes a scene, checking it belongs to the given repository"""
+    magic, file_format = _HEADER.unpack_from(data)
+    if magic != SCENE_FILE_MAGIC:
+        raise Exception("The data is not a mashcima scene")
+    if file_format != SCENE_FILE_FORMAT:
+        raise Exception("Unsupported scene format: " + str(file_format))
+
+    body = zlib.decompress(data[_HEADER.size:])
+    offset = 0
+
+    def _unpack(s: struct.Struct):
+        nonlocal offset
+        values = s.unpack_from(body, offset)
+        offset += s.size
+        return values
+
+    def _unpack_string(length: int) -> str:
+        nonlocal offset
+        value = body[offset:(offset + length)].decode("utf-8")
+        offset += length
+        return value
+
+    list_count, name_count, width, height, staff_count, sprite_count, \
+        beam_count, line_count, slur_count = _unpack(_SIZES)
+
+    scene = Scene(width, height)
+    scene.box = list(_unpack(_BOX))
+
+    # transformation
+    dtype_code, dest_width, dest_height = _unpack(_MATRIX_INFO)
+    if dtype_code != 0:
+        dtype = np.dtype(_MATRIX_DTYPES[dtype_code])
+        scene.matrix = np.frombuffer(
+            body, dtype=dtype, count=6, offset=offset
+        ).reshape(2, 3).copy()
+        offset += 6 * dtype.itemsize
+        scene.dest_size = (dest_width, dest_height)
+
+    scene.staves = list(_unpack(struct.Struct("<%di" % staff_count)))
+
+    list_names = []
+    for _ in range(list_count):
+        fingerprint, length = _unpack(_LIST)
+        list_names.append(_unpack_string(length))
+        if fingerprint != repo.get_symbol_list_fingerprint(list_names[-1]):
+            raise Exception(
+                "The scene was synthesized with a different symbol repository"
+            )
+    sprite_names = [
+        _unpack_string(_unpack(struct.Struct("<B"))[0])
+        for _ in range(name_count)
+    ]
+
+    for _ in range(sprite_count):
+        list_index, index, name_index, x, y, stretch_count = _unpack(_SPRITE)
+        stretches = _unpack(struct.Struct("<%dH" % stretch_count))
+        key = (
+            list_names[list_index],
+            index,
+            None if name_index == _NO_NAME else sprite_names[name_index]
+        )
+        scene.sprites.append((key, stretches, x, y))
+
+    for _ in range(beam_count):
+        chains = []
+        for _ in range(_unpack(struct.Struct("<B"))[0]):
+            point_count = _unpack(struct.Struct("<H"))[0]
+            values = _unpack(struct.Struct("<%di" % (2 * point_count)))
+            chains.append(list(zip(values[0::2], values[1::2])))
+        scene.beams.append(chains)
+
+    scene.lines = [_unpack(_LINE) for _ in range(line_count)]
+    scene.slurs = [_unpack(_SLUR) for _ in range(slur_count)]
+
+    return scene
+
+
+def save_scene(path: str, scene: Scene, repo: SymbolRepository):
+    """Stores a scene into a file (see scene_to_bytes)"""
+    with open(path, "wb") as f:
+        f.write(scene_to_bytes(scene, repo))
+
+
+def load_scene(path: str, repo: SymbolRepository) -> Scene:
+    """Loads a scene stored by save_scene"""
+    with open(path, "rb") as f:
+        return scene_from_bytes(f.read(), repo)
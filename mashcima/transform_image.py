@@ -2,7 +2,7 @@ import numpy as np
 import cv2
 import random
 import math
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 
 def _generate_transformation(img_shape):
@@ -53,26 +53,19 @@ def _generate_padding(img_shape):
     return top, right, bottom, left
 
 
-def transform_image(img: np.ndarray, box: Optional[List[int]]=None):
-    """Rotates and deforms the image slightly"""
-    # box = [x, y, width, height]
-
-    if box is None:
-        corners = np.array([
-            [[0, 0]],
-            [[img.shape[1], 0]],
-            [[img.shape[1], img.shape[0]]],
-            [[0, img.shape[0]]]
-        ], dtype=np.int32)
-        box_shape = img.shape
-    else:
-        box_shape = (box[3], box[2])
-        corners = np.array([
-            [[box[0], box[1]]],
-            [[box[0] + box_shape[1], box[1]]],
-            [[box[0] + box_shape[1], box[1] + box_shape[0]]],
-            [[box[0], box[1] + box_shape[0]]]
-        ], dtype=np.int32)
+def generate_transformation(box: List[int]) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    Generates a random transformation that rotates and deforms
+    the box = [x, y, width, height] of an image,
+    returns the affine matrix and the destination size (width, height)
+    """
+    box_shape = (box[3], box[2])
+    corners = np.array([
+        [[box[0], box[1]]],
+        [[box[0] + box_shape[1], box[1]]],
+        [[box[0] + box_shape[1], box[1] + box_shape[0]]],
+        [[box[0], box[1] + box_shape[0]]]
+    ], dtype=np.int32)
 
     # setup the transformation matrix
     matrix = _generate_transformation(box_shape)
@@ -94,7 +87,129 @@ def transform_image(img: np.ndarray, box: Optional[List[int]]=None):
         rect[3] + padding[0] + padding[2]
     )
 
-    # do the final image transformation
-    img = cv2.warpAffine(img, matrix, dest_size, borderValue=0)
+    return matrix, dest_size
+
+
+def get_crop_transformation(box: List[int]) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    Returns the transformation that only crops the box = [x, y, width, height]
+    (for scaling images that are not transformed otherwise)
+    """
+    matrix = np.array([
+        [1, 0, -box[0]],
+        [0, 1, -box[1]]
+    ], dtype=np.float32)
+    return matrix, (box[2], box[3])
+
+
+def scale_transformation(
+        matrix: np.ndarray,
+        dest_size: Tuple[int, int],
+        scale: Optional[float] = None,
+        height: Optional[int] = None
+) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    Folds scaling into a transformation, so that a single warp produces
+    the scaled image. Either the scale or the destination height is given.
+    """
+    assert (scale is None) != (height is None)
+    if height is not None:
+        scale = height / dest_size[1]
+    else:
+        height = max(int(round(dest_size[1] * scale)), 1)
+    width = max(int(round(dest_size[0] * scale)), 1)
+
+    # pixel centers are aligned the way cv2.resize aligns them
+    matrix = matrix * scale
+    matrix[:, 2] += (scale - 1) / 2
+
+    return matrix, (width, height)
+
+
+def get_prefilter_size(matrix: np.ndarray) -> int:
+    """
+    Size of the box filter applied before a shrinking transformation,
+    so that thin strokes are averaged instead of skipped by the sampling
+    (1 means no filtering, the size is odd so that the filter is centered)
+    """
+    scale = np.sqrt(abs(np.linalg.det(matrix[:, 0:2].astype(np.float64))))
+    return 2 * int(1 / (2 * scale)) + 1
+
+
+def get_source_region(
+        matrix: np.ndarray,
+        dest_size: Tuple[int, int],
+        img_shape: Tuple[int, int],
+        margin: int = 2
+) -> List[int]:
+    """
+    Returns the box [x, y, width, height] of an image with the given shape,
+    outside of which the transformation reads no pixels
+    (the margin has to be at least 2 pixels)
+    """
+    # source positions of the destination corner pixels
+    inverse = cv2.invertAffineTransform(matrix)
+    corners = np.array([
+        [[0, 0]],
+        [[dest_size[0] - 1, 0]],
+        [[dest_size[0] - 1, dest_size[1] - 1]],
+        [[0, dest_size[1] - 1]]
+    ], dtype=np.float32)
+    source_corners = cv2.transform(corners, inverse)[:, 0, :]
+
+    # bilinear interpolation reads one more pixel to the right and down,
+    # the margin covers that and the rounding inside of warpAffine
+    left = int(np.floor(source_corners[:, 0].min())) - margin
+    top = int(np.floor(source_corners[:, 1].min())) - margin
+    right = int(np.ceil(source_corners[:, 0].max())) + margin + 1
+    bottom = int(np.ceil(source_corners[:, 1].max())) + margin + 1
+
+    # pixels outside of the image are black anyway
+    left = min(max(left, 0), img_shape[1])
+    top = min(max(top, 0), img_shape[0])
+    right = min(max(right, left), img_shape[1])
+    bottom = min(max(bottom, top), img_shape[0])
+
+    return [left, top, right - left, bottom - top]
+
+
+def apply_transformation(
+        img: np.ndarray,
+        matrix: np.ndarray,
+        dest_size: Tuple[int, int],
+        offset: Tuple[int, int] = (0, 0)
+) -> np.ndarray:
+    """
+    Applies a transformation from generate_transformation, the offset
+    is the position of the given image within the image the transformation
+    was generated for (when only its source region has been rendered)
+    """
+    if img.shape[0] == 0 or img.shape[1] == 0:
+        return np.zeros(shape=(dest_size[1], dest_size[0]), dtype=img.dtype)
+
+    if offset == (0, 0):
+        return cv2.warpAffine(img, matrix, dest_size, borderValue=0)
+
+    # shift the inverse mapping, so that the region gets sampled
+    # at exactly the same positions as the whole image would be
+    inverse = cv2.invertAffineTransform(matrix.astype(np.float64))
+    inverse[0, 2] -= offset[0]
+    inverse[1, 2] -= offset[1]
+    return cv2.warpAffine(
+        img, inverse, dest_size,
+        flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+        borderValue=0
+    )
 
-    return img
+
+def transform_image(img: np.ndarray, box: Optional[List[int]]=None):
+    """Rotates and deforms the image slightly"""
+    # box = [x, y, width, height]
+
+    if box is None:
+        box = [0, 0, img.shape[1], img.shape[0]]
+
+    matrix, dest_size = generate_transformation(box)
+
+    # do the final image transformation
+    return apply_transformation(img, matrix, dest_size)
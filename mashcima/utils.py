@@ -1,55 +1,173 @@
-from muscima.io import CropObject
-from mashcima.SymbolRepository import SymbolRepository
 import cv2
 import numpy as np
-from typing import List, Tuple
+from typing import List, Tuple, Union, TYPE_CHECKING
 import random
 
+if TYPE_CHECKING:
+    from muscima.io import CropObject
+    from mashcima.SymbolRepository import SymbolRepository
+
+
+def get_ink_value(dtype) -> Union[int, float]:
+    """
+    Value of a fully inked pixel in images of the given dtype
+    (1.0 for float images, the maximum for integer ones, e.g. 255 for uint8)
+    """
+    dtype = np.dtype(dtype)
+    if np.issubdtype(dtype, np.integer):
+        return int(np.iinfo(dtype).max)
+    return 1.0
+
+
+def draw_line(img: np.ndarray, a: Tuple[int, int], b: Tuple[int, int], thickness: int):
+    """
+    Draws a line with the ink value of the image. Unlike cv2.line
+    it draws the same pixels no matter how the image border clips the line
+    (cv2 rounds the clipped end points, which shifts the whole thick line)
+    """
+    ink = get_ink_value(img.dtype)
+    left = min(a[0], b[0]) - thickness
+    top = min(a[1], b[1]) - thickness
+    right = max(a[0], b[0]) + thickness + 1
+    bottom = max(a[1], b[1]) + thickness + 1
+
+    # the line fits, draw it directly
+    if left >= 0 and top >= 0 and right <= img.shape[1] and bottom <= img.shape[0]:
+        cv2.line(img, a, b, thickness=thickness, color=ink)
+        return
+
+    # visible part of the line
+    x_from, x_to = max(left, 0), min(right, img.shape[1])
+    y_from, y_to = max(top, 0), min(bottom, img.shape[0])
+    if x_from >= x_to or y_from >= y_to:
+        return
+
+    # draw the whole line separately and copy the visible part
+    line = np.zeros(shape=(bottom - top, right - left), dtype=np.uint8)
+    cv2.line(
+        line,
+        (a[0] - left, a[1] - top),
+        (b[0] - left, b[1] - top),
+        thickness=thickness,
+        color=1
+    )
+    np.copyto(
+        img[y_from:y_to, x_from:x_to],
+        ink,
+        where=line[(y_from - top):(y_to - top), (x_from - left):(x_to - left)].view(np.bool_)
+    )
+
+
+def draw_polylines(img: np.ndarray, polylines: List[np.ndarray], thickness: int):
+    """
+    Draws open polylines (arrays of [x, y] rows) with the ink value
+    of the image. Polylines inside the image are drawn in a single call,
+    the ones clipped by the image border are drawn like in draw_line.
+    """
+    ink = get_ink_value(img.dtype)
+    inside = []
+    for points in polylines:
+        if len(points) == 0:
+            continue
+        points = np.asarray(points, dtype=np.int32)  # required by opencv
+        left, top = points.min(axis=0) - thickness
+        right, bottom = points.max(axis=0) + thickness + 1
+
+        if left >= 0 and top >= 0 and right <= img.shape[1] and bottom <= img.shape[0]:
+            inside.append(points)
+            continue
+
+        # visible part of the polyline
+        x_from, x_to = max(left, 0), min(right, img.shape[1])
+        y_from, y_to = max(top, 0), min(bottom, img.shape[0])
+        if x_from >= x_to or y_from >= y_to:
+            continue
+
+        # draw the whole polyline separately and copy the visible part
+        scratch = np.zeros(shape=(bottom - top, right - left), dtype=np.uint8)
+        cv2.polylines(
+            scratch, [(points - [left, top]).astype(np.int32)], False,
+            thickness=thickness, color=1
+        )
+        np.copyto(
+            img[y_from:y_to, x_from:x_to],
+            ink,
+            where=scratch[(y_from - top):(y_to - top), (x_from - left):(x_to - left)].view(np.bool_)
+        )
+
+    if len(inside) > 0:
+        cv2.polylines(img, inside, False, thickness=thickness, color=ink)
+
+
+def fill_polygons(img: np.ndarray, polygons: List[np.ndarray]):
+    """
+    Fills non-overlapping polygons with the ink value of the image
+    in a single call. Like draw_line, the pixels do not depend
+    on how the image border clips the polygons.
+    """
+    if len(polygons) == 0:
+        return
+    ink = get_ink_value(img.dtype)
+    points = np.concatenate(polygons)
+    left, top = points.min(axis=0).tolist()
+    right, bottom = (points.max(axis=0) + 1).tolist()
+
+    # the polygons fit, draw them directly
+    if left >= 0 and top >= 0 and right <= img.shape[1] and bottom <= img.shape[0]:
+        cv2.fillPoly(img, polygons, color=ink)
+        return
+
+    # visible part of the polygons
+    x_from, x_to = max(left, 0), min(right, img.shape[1])
+    y_from, y_to = max(top, 0), min(bottom, img.shape[0])
+    if x_from >= x_to or y_from >= y_to:
+        return
+
+    # draw the polygons separately and copy the visible part
+    scratch = np.zeros(shape=(bottom - top, right - left), dtype=np.uint8)
+    cv2.fillPoly(
+        scratch, [(p - [left, top]).astype(np.int32) for p in polygons], color=1
+    )
+    np.copyto(
+        img[y_from:y_to, x_from:x_to],
+        ink,
+        where=scratch[(y_from - top):(y_to - top), (x_from - left):(x_to - left)].view(np.bool_)
+    )
+
 
 def fork(label: str, stay_probability: float):
     """Helper for random binary splitting"""
     return random.random() <= stay_probability
 
 
-def get_outlink_to(repo: SymbolRepository, obj: CropObject, clsname: str) -> CropObject:
-    for l in obj.outlinks:
-        resolved_link = repo.CROP_OBJECT_LOOKUP_DICTS[obj.doc][l]
-        if resolved_link.clsname == clsname:
-            return resolved_link
-    raise Exception("Object has no outlink of requested clsname")
+def get_outlink_to(repo: "SymbolRepository", obj: "CropObject", clsname: str) -> "CropObject":
+    outlinks = repo.get_outlinks(obj, clsname)
+    if len(outlinks) == 0:
+        raise Exception("Object has no outlink of requested clsname")
+    return outlinks[0]
 
 
-def has_outlink_to(repo: SymbolRepository, obj: CropObject, clsname: str) -> bool:
-    for l in obj.outlinks:
-        resolved_link = repo.CROP_OBJECT_LOOKUP_DICTS[obj.doc][l]
-        if resolved_link.clsname == clsname:
-            return True
-    return False
+def has_outlink_to(repo: "SymbolRepository", obj: "CropObject", clsname: str) -> bool:
+    return len(repo.get_outlinks(obj, clsname)) > 0
 
 
-def get_connected_components_not_touching_image_border(
+def get_centers_of_components_not_touching_image_border(
         mask: np.ndarray
-) -> List[np.ndarray]:
+) -> np.ndarray:
     """
-    Takes a binary image and finds all components (areas with value 1)
-    that don't touch the image border.
+    Takes a binary image and returns centers of all components
+    (areas with value 1) that don't touch the image border,
+    as an integer array of [x, y] rows. Components keep the iteration order
+    of a set of their labels (not sorted), the order they have always been
+    listed in, so ties between equally distant components resolve as before.
     """
-    height, width = mask.shape
-    ret, labels = cv2.connectedComponents(mask)
-
-    indices_to_remove = set()
-    for x in range(width):
-        indices_to_remove.add(labels[0, x])
-        indices_to_remove.add(labels[height - 1, x])
-    for y in range(height):
-        indices_to_remove.add(labels[y, 0])
-        indices_to_remove.add(labels[y, width - 1])
-    indices = set(range(1, ret)) - indices_to_remove
-
-    out_masks: List[np.ndarray] = []
-    for i in indices:
-        out_masks.append(labels == i)
-    return out_masks
+    ret, labels, stats, centroids = cv2.connectedComponentsWithStats(mask)
+    border = np.concatenate([
+        labels[0, :], labels[-1, :], labels[:, 0], labels[:, -1]
+    ])
+    indices = list(set(range(1, ret)) - set(np.unique(border).tolist()))
+    # truncate the same way get_center_of_component does
+    return centroids[np.array(indices, dtype=np.int64)].astype(np.int64)
 
 
 def get_center_of_component(mask: np.ndarray) -> Tuple[int, int]:
@@ -61,25 +179,3 @@ def get_center_of_component(mask: np.ndarray) -> Tuple[int, int]:
     x = int(m["m10"] / m["m00"])
     y = int(m["m01"] / m["m00"])
     return x, y
-
-
-def point_distance_squared(ax: int, ay: int, bx: int, by: int) -> int:
-    """Returns distance between two points squared"""
-    return (ax - bx) ** 2 + (ay - by) ** 2
-
-
-def sort_components_by_proximity_to_point(
-        components: List[np.ndarray], x: int, y: int
-) -> List[np.ndarray]:
-    with_distances = [
-        {
-            "component": c,
-            "distanceSqr": point_distance_squared(
-                *get_center_of_component(c),
-                x, y
-            )
-        }
-        for c in components
-    ]
-    with_distances.sort(key=lambda x: x["distanceSqr"])
-    return [x["component"] for x in with_distances]